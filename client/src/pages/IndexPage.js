@@ -24,8 +24,19 @@ export default function IndexPage() {
       );
 
       console.log('서버 응답:', res.data);
-      setFinalVideo(`/data/${res.data.final_video}`);
-      setDurations(res.data.durations);
+
+      // 작업은 서버 워커에서 돌기 때문에 끝날 때까지 상태를 폴링
+      let job = res.data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(r => setTimeout(r, 2000));
+        job = (await axios.get(res.data.status_url)).data;
+        setDurations(job.durations);
+      }
+      if (job.status !== 'done') {
+        throw new Error(job.error);
+      }
+      setFinalVideo(`/data/${job.result.final_video}`);
+      setDurations(job.durations);
     } catch (err) {
       console.error(err);
       alert('서버 호출 중 에러가 발생했습니다');
@@ -1,19 +1,61 @@
 # flask-server/app.py
 from flask import Flask
-from config import DATA_DIR
+from config import (
+    DATA_DIR, MAX_CONCURRENT_JOBS, WARM_MODELS_ON_STARTUP, JOB_INDEX_DIR,
+    UPLOAD_DIR, MAX_UPLOAD_BYTES, MAX_VIDEO_SECONDS, MAX_VIDEO_PIXELS, UPLOAD_PROBE_BYTES,
+    REFERENCE_CACHE_DIR, REFERENCE_CACHE_MAX_BYTES,
+    PARALLEL_EXTRACT, EXTRACT_PROCESSES, CPU_BUDGET, SYNC_TRIM,
+    EXTRACT_SEGMENT_FRAMES, EXTRACT_SEGMENT_WARMUP, RENDER_CHUNK_FRAMES,
+    DATA_MAX_BYTES, PRUNE_INTERMEDIATES, KEEP_SOURCE_VIDEOS,
+    RETENTION_SWEEP_SECONDS, RETENTION_GRACE_SECONDS
+)
 # from views.compare_view import compare_bp
-from views.compare import compare_bp
-from flask import send_from_directory
+from views.compare import (
+    compare_bp, init_job_queue, init_reference_cache, init_extract_pool, init_retention
+)
+from services.artifacts import serve_artifact
 
 
 app = Flask(__name__, static_folder='static')
 app.config['DATA_DIR'] = DATA_DIR
+app.config['MAX_CONCURRENT_JOBS'] = MAX_CONCURRENT_JOBS
+app.config['WARM_MODELS_ON_STARTUP'] = WARM_MODELS_ON_STARTUP
+app.config['JOB_INDEX_DIR'] = JOB_INDEX_DIR
+app.config['UPLOAD_DIR'] = UPLOAD_DIR
+app.config['MAX_UPLOAD_BYTES'] = MAX_UPLOAD_BYTES
+app.config['MAX_VIDEO_SECONDS'] = MAX_VIDEO_SECONDS
+app.config['MAX_VIDEO_PIXELS'] = MAX_VIDEO_PIXELS
+app.config['UPLOAD_PROBE_BYTES'] = UPLOAD_PROBE_BYTES
+app.config['REFERENCE_CACHE_DIR'] = REFERENCE_CACHE_DIR
+app.config['REFERENCE_CACHE_MAX_BYTES'] = REFERENCE_CACHE_MAX_BYTES
+app.config['PARALLEL_EXTRACT'] = PARALLEL_EXTRACT
+app.config['EXTRACT_PROCESSES'] = EXTRACT_PROCESSES
+app.config['CPU_BUDGET'] = CPU_BUDGET
+app.config['SYNC_TRIM'] = SYNC_TRIM
+app.config['EXTRACT_SEGMENT_FRAMES'] = EXTRACT_SEGMENT_FRAMES
+app.config['EXTRACT_SEGMENT_WARMUP'] = EXTRACT_SEGMENT_WARMUP
+app.config['RENDER_CHUNK_FRAMES'] = RENDER_CHUNK_FRAMES
+app.config['DATA_MAX_BYTES'] = DATA_MAX_BYTES
+app.config['PRUNE_INTERMEDIATES'] = PRUNE_INTERMEDIATES
+app.config['KEEP_SOURCE_VIDEOS'] = KEEP_SOURCE_VIDEOS
+app.config['RETENTION_SWEEP_SECONDS'] = RETENTION_SWEEP_SECONDS
+app.config['RETENTION_GRACE_SECONDS'] = RETENTION_GRACE_SECONDS
 
 app.register_blueprint(compare_bp)
+# spawn 으로 뜬 추출 워커 프로세스가 이 파일을 다시 import 할 때는 풀을 만들지 않음
+if __name__ != '__mp_main__':
+    init_job_queue(app)
+    init_reference_cache(app)
+    init_extract_pool(app)
+    init_retention(app)
 
 @app.route('/data/<path:filename>')
 def serve_data(filename):
-    return send_from_directory(app.config['DATA_DIR'], filename)
+    # ETag / immutable 캐시 / Range / 미리 압축한 JSON
+    retention = app.extensions.get('retention')
+    if retention is not None:
+        retention.touch(filename.split('/', 1)[0])
+    return serve_artifact(app.config['DATA_DIR'], filename)
 
 if __name__ == '__main__':
     app.run(debug=True, use_reloader=False)
@@ -5,3 +5,56 @@ import os
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'static', 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
+
+# 동시에 실행할 compare 작업 수 (워커 풀 크기)
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 2))
+
+# 서버 시작 시 워커마다 YOLO/MediaPipe 모델을 미리 로드·워밍업할지 여부
+WARM_MODELS_ON_STARTUP = os.environ.get('WARM_MODELS_ON_STARTUP', '1') == '1'
+
+# 같은 댄서/연습생 업로드를 다시 계산하지 않도록 내용 해시 → job_id 를 기록하는 위치
+JOB_INDEX_DIR = os.environ.get('JOB_INDEX_DIR', os.path.join(BASE_DIR, 'cache', 'jobs'))
+
+# 청크 업로드 임시 저장 위치와 업로드 검사 기준 (ffprobe 로 헤더를 읽자마자 확인)
+UPLOAD_DIR        = os.environ.get('UPLOAD_DIR', os.path.join(BASE_DIR, 'cache', 'uploads'))
+MAX_UPLOAD_BYTES  = int(os.environ.get('MAX_UPLOAD_BYTES', 2 * 1024**3))
+MAX_VIDEO_SECONDS = float(os.environ.get('MAX_VIDEO_SECONDS', 20 * 60))
+MAX_VIDEO_PIXELS  = int(os.environ.get('MAX_VIDEO_PIXELS', 3840 * 2160))
+UPLOAD_PROBE_BYTES = int(os.environ.get('UPLOAD_PROBE_BYTES', 4 * 1024**2))
+
+# 레퍼런스(댄서) 영상 키포인트/오디오 캐시 위치와 디스크 한도 (0 이면 캐시 사용 안 함)
+REFERENCE_CACHE_DIR = os.environ.get('REFERENCE_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'reference'))
+REFERENCE_CACHE_MAX_BYTES = int(os.environ.get('REFERENCE_CACHE_MAX_BYTES', 20 * 1024**3))
+
+# 댄서/연습생 키포인트 추출을 별도 프로세스에서 동시에 실행할지 여부와
+# 모든 작업이 공유하는 추출 프로세스 수 / 전체 CPU 코어 예산
+PARALLEL_EXTRACT  = os.environ.get('PARALLEL_EXTRACT', '1') == '1'
+EXTRACT_PROCESSES = int(os.environ.get('EXTRACT_PROCESSES', 2))
+CPU_BUDGET        = int(os.environ.get('CPU_BUDGET', os.cpu_count() or 1))
+
+# 이 프레임 수보다 긴 영상은 구간으로 나눠 여러 추출 프로세스에서 동시에 처리 (0 이면 나누지 않음)
+# track 모드에서는 구간마다 앞쪽 EXTRACT_SEGMENT_WARMUP 프레임을 더 디코딩해 추적 상태를 맞춤
+EXTRACT_SEGMENT_FRAMES = int(os.environ.get('EXTRACT_SEGMENT_FRAMES', 1800))
+EXTRACT_SEGMENT_WARMUP = int(os.environ.get('EXTRACT_SEGMENT_WARMUP', 30))
+
+# 피드백 영상도 이 프레임 수 단위 구간으로 나눠 같은 프로세스 풀에서 인코딩 후 concat (0 이면 한 번에)
+RENDER_CHUNK_FRAMES = int(os.environ.get('RENDER_CHUNK_FRAMES', 900))
+
+# 작업 폴더 보존/정리
+#   DATA_MAX_BYTES          : static/data 전체 한도, 넘으면 가장 오래 안 쓴 작업부터 삭제 (0 이면 제한 없음)
+#   PRUNE_INTERMEDIATES     : 작업이 끝나면 중간 산출물(원본/싱크 영상, 프레임, 키포인트 저장소 등) 바로 삭제
+#                             (끄면 주기 정리에서도 남김 — SAVE_FRAMES 프레임, resume 용 stages/ 보존)
+#   KEEP_SOURCE_VIDEOS      : 원본 영상은 남겨서 재채점 후 영상 다시 렌더링/resume 을 허용
+#                             (끄면 끝나자마자 지워 용량을 아끼는 대신 {"render": true} 재채점은 409)
+#   RETENTION_SWEEP_SECONDS : 백그라운드 정리 주기 (0 이면 끄기)
+#   RETENTION_GRACE_SECONDS : 이 시간 동안 갱신되지 않은 업로드/버려진 폴더/멈춘 작업은 정리 대상
+DATA_MAX_BYTES          = int(os.environ.get('DATA_MAX_BYTES', 50 * 1024**3))
+PRUNE_INTERMEDIATES     = os.environ.get('PRUNE_INTERMEDIATES', '1') == '1'
+KEEP_SOURCE_VIDEOS      = os.environ.get('KEEP_SOURCE_VIDEOS', '1') == '1'
+RETENTION_SWEEP_SECONDS = float(os.environ.get('RETENTION_SWEEP_SECONDS', 300))
+RETENTION_GRACE_SECONDS = float(os.environ.get('RETENTION_GRACE_SECONDS', 24 * 3600))
+
+# 싱크 결과를 넘기는 방식
+#   offsets: 재인코딩 없이 (시작 프레임, 길이)만 넘기고 추출/렌더링이 원본을 seek (인코딩은 최종 렌더링 한 번)
+#   cut    : 싱크 단계에서 *_synced.mp4 를 만들어 넘김 (영상당 ffmpeg 한 번)
+SYNC_TRIM = os.environ.get('SYNC_TRIM', 'offsets')
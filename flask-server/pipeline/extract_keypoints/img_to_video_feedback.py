@@ -7,6 +7,297 @@ import cv2
 import numpy as np
 from tqdm import tqdm
 from PIL import Image, ImageDraw, ImageFont
+import mediapipe as mp
+
+from .yolo_and_mediapipe_pose import SegmentCapture
+
+POSE_CONNECTIONS = sorted(mp.solutions.pose.POSE_CONNECTIONS)
+
+# 피드백 메시지용 한글 폰트. FEEDBACK_FONT 가 없으면 아래 후보 중 처음 찾은 것을 사용
+FEEDBACK_FONT = os.environ.get("FEEDBACK_FONT")
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    r"C:\Windows\Fonts\malgun.ttf",
+)
+_fonts = {}
+
+
+class FfmpegWriter:
+    """
+    BGR 프레임을 raw 로 ffmpeg stdin 에 흘려 넣어 바로 인코딩합니다.
+    (중간 JPEG 파일 없이 libx264 한 번)
+    audio: (영상 경로, 시작 초) 를 주면 그 영상의 오디오를 같은 패스에서 aac 로 붙입니다.
+    faststart: moov 를 파일 앞으로 옮겨 다운로드가 끝나기 전에 재생 가능하게 함
+    """
+
+    def __init__(self, out_video_path: str, width: int, height: int, fps: float,
+                 audio: tuple = None, faststart: bool = True):
+        self.out_video_path = out_video_path
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+        ]
+        if audio is not None:
+            audio_path, audio_start = audio
+            cmd += ["-ss", f"{audio_start:.6f}", "-i", audio_path,
+                    "-map", "0:v:0", "-map", "1:a:0?",
+                    "-c:a", "aac", "-b:a", "128k", "-shortest"]
+        cmd += [
+            # yuv420p 는 짝수 해상도가 필요
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p",
+        ]
+        if faststart:
+            cmd += ["-movflags", "+faststart"]
+        cmd += [out_video_path]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray):
+        self.proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        self.proc.stdin.close()
+        ret = self.proc.wait()
+        if ret != 0:
+            raise subprocess.CalledProcessError(ret, "ffmpeg")
+
+
+def draw_skeleton(img: np.ndarray, kp: np.ndarray, vis: np.ndarray, min_vis: float = 0.5):
+    """
+    저장된 키포인트(픽셀 좌표)로 스켈레톤을 img 위에 그립니다.
+    kp: (J, 3), vis: (J,)
+    """
+    pts = kp[:, :2].astype(np.int32)
+    ok = vis >= min_vis
+    for a, b in POSE_CONNECTIONS:
+        if ok[a] and ok[b]:
+            cv2.line(img, tuple(pts[a]), tuple(pts[b]), (224, 224, 224), 2, cv2.LINE_AA)
+    for j in np.flatnonzero(ok):
+        cv2.circle(img, tuple(pts[j]), 3, (0, 138, 255), -1, cv2.LINE_AA)
+
+
+def _compose(t_img: np.ndarray, s_img: np.ndarray) -> np.ndarray:
+    h, w = t_img.shape[:2]
+    if s_img.shape[:2] != (h, w):
+        s_img = cv2.resize(s_img, (w, h))
+    canvas = np.empty((h*2, w, 3), dtype=np.uint8)
+    canvas[:h] = t_img
+    canvas[h:] = s_img
+    return canvas
+
+
+def resolve_font(font_path: str = None, font_size: int = 24):
+    """
+    font_path → FEEDBACK_FONT → FONT_CANDIDATES 순서로 폰트를 찾아 한 번만 로드합니다.
+    아무것도 없으면 PIL 기본 폰트 (한글은 깨질 수 있음)
+    """
+    key = (font_path, font_size)
+    font = _fonts.get(key)
+    if font is None:
+        paths = [p for p in (font_path, FEEDBACK_FONT) if p] + list(FONT_CANDIDATES)
+        found = next((p for p in paths if os.path.isfile(p)), None)
+        if found is None:
+            print("[Render] 한글 폰트를 찾지 못해 기본 폰트를 사용합니다 (FEEDBACK_FONT 로 지정 가능)")
+            font = ImageFont.load_default()
+        else:
+            font = ImageFont.truetype(found, font_size)
+        _fonts[key] = font
+    return font
+
+
+class MessageOverlay:
+    """
+    메시지 묶음(tuple)마다 텍스트 박스를 RGBA 패치로 한 번만 래스터화해 두고,
+    프레임에는 numpy 캔버스 위에 제자리 알파 블렌딩만 합니다.
+    (같은 메시지가 연속 프레임에 이어지므로 PIL 변환/텍스트 측정은 메시지가 바뀔 때만)
+    """
+
+    def __init__(self, font, max_entries: int = 256):
+        self.font = font
+        self.max_entries = max_entries
+        self._patches = {}
+
+    def _rasterize(self, msgs: tuple):
+        padding_x, padding_y = 10, 10
+        line_spacing = 5
+
+        # 텍스트 박스 크기 계산
+        sizes = [self.font.getbbox(m) for m in msgs]
+        widths = [s[2]-s[0] for s in sizes]
+        heights= [s[3]-s[1] for s in sizes]
+        box_w = max(widths)+padding_x*2
+        box_h = sum(heights)+padding_y*2 + line_spacing*(len(msgs)-1)
+
+        patch = Image.new("RGBA", (box_w+1, box_h+1), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(patch)
+        draw.rectangle([0, 0, box_w, box_h], fill=(255,255,255,255))
+
+        y = padding_y
+        for m,hgt in zip(msgs, heights):
+            draw.text((padding_x, y), m, font=self.font, fill=(0,0,0,255))
+            y += hgt + line_spacing
+
+        rgba = np.asarray(patch)
+        alpha = rgba[..., 3:].astype(np.float32) / 255.0
+        if np.all(alpha == 1.0):
+            # 불투명 박스면 블렌딩 없이 복사만
+            return rgba[..., 2::-1].copy(), None
+        # BGR 캔버스에 맞춰 채널 순서를 뒤집고 미리 알파를 곱해 둠
+        return rgba[..., 2::-1] * alpha, 1.0 - alpha
+
+    def draw(self, canvas: np.ndarray, msgs: list, h: int, w: int) -> np.ndarray:
+        key = tuple(msgs)
+        entry = self._patches.get(key)
+        if entry is None:
+            if len(self._patches) >= self.max_entries:
+                self._patches.clear()
+            entry = self._patches[key] = self._rasterize(key)
+        color, inv_alpha = entry
+
+        # 박스 위치: 가로 가운데, 위에서 60% (캔버스 밖으로 나가는 부분은 잘라냄)
+        ph, pw = color.shape[:2]
+        x0 = (w - (pw - 1))//2
+        y0 = int(h*0.6)
+        cx0, cy0 = max(0, x0), max(0, y0)
+        cx1, cy1 = min(canvas.shape[1], x0 + pw), min(canvas.shape[0], y0 + ph)
+        if cx1 <= cx0 or cy1 <= cy0:
+            return canvas
+        src = (slice(cy0 - y0, cy1 - y0), slice(cx0 - x0, cx1 - x0))
+        roi = canvas[cy0:cy1, cx0:cx1]
+        if inv_alpha is None:
+            roi[:] = color[src]
+        else:
+            roi[:] = (roi * inv_alpha[src] + color[src]).astype(np.uint8)
+        return canvas
+
+
+def render_feedback_stream(
+    feedback_json: str,
+    teacher_video: str,
+    student_video: str,
+    teacher_kp: tuple[np.ndarray, np.ndarray],
+    student_kp: tuple[np.ndarray, np.ndarray],
+    out_video_path: str,
+    fps: float = 30,
+    font_path: str = None,
+    font_size: int = 24,
+    teacher_start: int = 0,
+    student_start: int = 0,
+    num_frames: int = None,
+    audio: tuple = None,
+    frame_base: int = 0,
+    faststart: bool = True,
+    student_index: np.ndarray = None
+):
+    """
+    feedback_json: {frame_idx: [메시지, ...], ...}
+    teacher_video/student_video: 싱크된 두 영상 (또는 원본 + teacher_start/student_start 시작 프레임)
+    teacher_kp/student_kp: (kp (T, J, 3) 픽셀 좌표, vis (T, J)) — 스켈레톤은 렌더링 시점에 그림
+    out_video_path: 최종 비디오(.mp4) 경로
+    num_frames: 렌더링할 최대 프레임 수
+    audio: (영상 경로, 시작 초) — 주어지면 인코딩 패스에서 오디오까지 같이 붙임
+    frame_base: 구간 렌더링일 때 이 구간 0번 프레임의 전체 타임라인 인덱스 (피드백 메시지 조회용,
+                teacher_kp/student_kp 는 이 구간만 잘라서 넘김)
+    faststart: 최종 결과물이면 True (concat 으로 이어 붙일 구간 영상은 False)
+    student_index: DTW 정렬일 때 출력 프레임 i 에 보여줄 연습생 프레임 (student_start / student_kp 기준).
+                   채점에 쓴 연습생 자세와 같은 프레임을 그리기 위함. None 이면 같은 인덱스
+    프레임 폴더를 만들지 않고 디코딩 → 합성 → ffmpeg stdin 으로 바로 인코딩합니다.
+    """
+    # 1) 피드백 불러오기
+    with open(feedback_json, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    # 2) 디코더 / 폰트
+    t_cap = SegmentCapture(teacher_video, teacher_start, num_frames)
+    if student_index is not None:
+        # 정렬 경로는 단조 증가 → 연습생 영상은 앞으로만 읽으면서 같은 프레임을 반복해서 보여줌
+        student_index = np.maximum.accumulate(np.asarray(student_index, dtype=np.int64))
+        s_cap = SegmentCapture(student_video, student_start, int(student_index[-1]) + 1)
+        total = min(t_cap.total, len(student_index))
+    else:
+        s_cap = SegmentCapture(student_video, student_start, num_frames)
+        total = min(t_cap.total, s_cap.total)
+    overlay = MessageOverlay(resolve_font(font_path, font_size))
+    t_kp, t_vis = teacher_kp
+    s_kp, s_vis = student_kp
+
+    # 3) 프레임별 합성 후 인코더로 전달
+    writer = None
+    pbar = tqdm(total=total, desc="Rendering feedback frames")
+    i = 0
+    s_pos, s_frame = -1, None
+    try:
+        while i < total:
+            ok_t, t_img = t_cap.read()
+            if not ok_t:
+                break
+            if student_index is None:
+                j = i
+                ok_s, s_img = s_cap.read()
+            else:
+                j = int(student_index[i])
+                ok_s = True
+                while ok_s and s_pos < j:
+                    ok_s, s_frame = s_cap.read()
+                    s_pos += 1
+                s_img = s_frame.copy() if ok_s else None
+            if not ok_s:
+                break
+            if i < len(t_kp):
+                draw_skeleton(t_img, t_kp[i], t_vis[i])
+            if j < len(s_kp):
+                draw_skeleton(s_img, s_kp[j], s_vis[j])
+
+            h, w = t_img.shape[:2]
+            canvas = _compose(t_img, s_img)
+            msgs = raw.get(str(frame_base + i), [])
+            if msgs:
+                overlay.draw(canvas, msgs, h, w)
+
+            if writer is None:
+                writer = FfmpegWriter(out_video_path, w, h*2, fps, audio=audio, faststart=faststart)
+            writer.write(canvas)
+            i += 1
+            pbar.update(1)
+    finally:
+        pbar.close()
+        t_cap.release()
+        s_cap.release()
+        if writer is not None:
+            writer.close()
+
+    return out_video_path
+
+
+def concat_videos(parts: list, out_video_path: str, audio: tuple = None):
+    """
+    같은 설정으로 인코딩된 구간 영상들을 concat demuxer 로 재인코딩 없이 이어 붙입니다.
+    audio: (영상 경로, 시작 초) — 주어지면 같은 ffmpeg 호출에서 오디오를 aac 로 붙임
+    """
+    list_path = os.path.splitext(out_video_path)[0] + "_concat.txt"
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for p in parts:
+            f.write(f"file '{os.path.abspath(p)}'\n")
+
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio is not None:
+        audio_path, audio_start = audio
+        cmd += ["-ss", f"{audio_start:.6f}", "-i", audio_path,
+                "-map", "0:v:0", "-map", "1:a:0?",
+                "-c:a", "aac", "-b:a", "128k", "-shortest"]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", out_video_path]
+    try:
+        subprocess.run(cmd, check=True)
+    finally:
+        os.remove(list_path)
+    return out_video_path
+
 
 def render_feedback_video(
     feedback_json: str,
@@ -14,7 +305,7 @@ def render_feedback_video(
     student_frames: str,
     out_video_path: str,
     fps: int = 30,
-    font_path: str = r"C:\Windows\Fonts\malgun.ttf",
+    font_path: str = None,
     font_size: int = 24
 ):
     """
@@ -29,60 +320,29 @@ def render_feedback_video(
     # 2) 프레임 수 결정
     total = max(len(os.listdir(teacher_frames)), len(os.listdir(student_frames)))
 
-    # 3) 캔버스용 임시 폴더
-    canvas_dir = os.path.join(os.path.dirname(out_video_path), "canvas_frames")
-    os.makedirs(canvas_dir, exist_ok=True)
-
-    # 4) 한글 폰트
-    font = ImageFont.truetype(font_path, font_size)
-
-    # 5) 프레임별 렌더링
-    for i in tqdm(range(total), desc="Rendering feedback frames"):
-        msgs = raw.get(str(i), [])
-        t_img = cv2.imread(os.path.join(teacher_frames, f"frame_{i:06d}.jpg"))
-        s_img = cv2.imread(os.path.join(student_frames, f"frame_{i:06d}.jpg"))
-        if t_img is None or s_img is None:
-            continue
-        h, w = t_img.shape[:2]
-        s_img = cv2.resize(s_img, (w, h))
-        canvas = np.zeros((h*2, w, 3), dtype=np.uint8)
-        canvas[:h] = t_img
-        canvas[h:] = s_img
-
-        if msgs:
-            pil = Image.fromarray(canvas)
-            draw = ImageDraw.Draw(pil)
-            padding_x, padding_y = 10, 10
-            line_spacing = 5
-
-            # 텍스트 박스 크기 계산
-            sizes = [draw.textbbox((0,0), m, font=font) for m in msgs]
-            widths = [s[2]-s[0] for s in sizes]
-            heights= [s[3]-s[1] for s in sizes]
-            box_w = max(widths)+padding_x*2
-            box_h = sum(heights)+padding_y*2 + line_spacing*(len(msgs)-1)
-
-            x0 = (w - box_w)//2
-            y0 = int(h*0.6)
-            draw.rectangle([x0, y0, x0+box_w, y0+box_h], fill=(255,255,255))
-
-            y = y0+padding_y
-            for m,hgt in zip(msgs, heights):
-                draw.text((x0+padding_x, y), m, font=font, fill=(0,0,0))
-                y += hgt + line_spacing
-
-            canvas = np.array(pil)
-
-        out_path = os.path.join(canvas_dir, f"frame_{i:06d}.jpg")
-        cv2.imwrite(out_path, canvas)
-
-    # 6) ffmpeg로 비디오 생성
-    subprocess.run([
-        "ffmpeg", "-y",
-        "-framerate", str(fps),
-        "-i", os.path.join(canvas_dir, "frame_%06d.jpg"),
-        "-c:v", "libx264", "-pix_fmt", "yuv420p",
-        out_video_path
-    ], check=True)
+    # 3) 한글 폰트 / 메시지 오버레이 캐시
+    overlay = MessageOverlay(resolve_font(font_path, font_size))
+
+    # 4) 프레임별 렌더링 → ffmpeg stdin
+    writer = None
+    try:
+        for i in tqdm(range(total), desc="Rendering feedback frames"):
+            msgs = raw.get(str(i), [])
+            t_img = cv2.imread(os.path.join(teacher_frames, f"frame_{i:06d}.jpg"))
+            s_img = cv2.imread(os.path.join(student_frames, f"frame_{i:06d}.jpg"))
+            if t_img is None or s_img is None:
+                continue
+            h, w = t_img.shape[:2]
+            canvas = _compose(t_img, s_img)
+
+            if msgs:
+                overlay.draw(canvas, msgs, h, w)
+
+            if writer is None:
+                writer = FfmpegWriter(out_video_path, w, h*2, fps)
+            writer.write(canvas)
+    finally:
+        if writer is not None:
+            writer.close()
 
     return out_video_path
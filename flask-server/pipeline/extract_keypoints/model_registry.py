@@ -0,0 +1,103 @@
+# flask-server/pipeline/extract_keypoints/model_registry.py
+# YOLO / MediaPipe Pose 를 프로세스(스레드)당 한 번만 로드하고 워밍업해 두는 레지스트리
+
+import os
+import time
+import logging
+import warnings
+import threading
+import numpy as np
+
+YOLO_WEIGHTS = os.environ.get("YOLO_WEIGHTS", "yolov8n.pt")
+
+POSE_OPTIONS = dict(
+    model_complexity=1,
+    enable_segmentation=False,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5
+)
+
+# YOLO predictor / MediaPipe graph 는 스레드 안전하지 않으므로 스레드마다 따로 가짐
+_local = threading.local()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _quiet_logs():
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    warnings.filterwarnings("ignore")
+    logging.getLogger("ultralytics").setLevel(logging.WARNING)
+
+
+def _record(key: str, **fields):
+    name = f"{os.getpid()}/{threading.current_thread().name}"
+    with _stats_lock:
+        _stats.setdefault(name, {}).setdefault(key, {}).update(fields)
+
+
+def get_yolo():
+    """
+    현재 스레드의 YOLO 인스턴스 (처음 호출 시 로드 + 워밍업)
+    """
+    yolo = getattr(_local, "yolo", None)
+    if yolo is None:
+        from ultralytics import YOLO
+        _quiet_logs()
+        start = time.time()
+        yolo = YOLO(YOLO_WEIGHTS)
+        loaded = time.time()
+        # 첫 추론에서 그래프/커널 초기화 비용이 들기 때문에 빈 프레임으로 한 번 돌려 둠
+        yolo(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        _record("yolo", weights=YOLO_WEIGHTS, load_sec=loaded - start,
+                warmup_sec=time.time() - loaded, warmed=True)
+        _local.yolo = yolo
+    return yolo
+
+
+def get_pose(static_image_mode: bool = True):
+    """
+    현재 스레드의 MediaPipe Pose 인스턴스 (모드별로 하나씩)
+    """
+    poses = getattr(_local, "poses", None)
+    if poses is None:
+        poses = _local.poses = {}
+    pose = poses.get(static_image_mode)
+    if pose is None:
+        import mediapipe as mp
+        _quiet_logs()
+        start = time.time()
+        pose = mp.solutions.pose.Pose(static_image_mode=static_image_mode, **POSE_OPTIONS)
+        loaded = time.time()
+        pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+        if not static_image_mode:
+            pose.reset()
+        key = "pose_static" if static_image_mode else "pose_video"
+        _record(key, load_sec=loaded - start, warmup_sec=time.time() - loaded, warmed=True)
+        poses[static_image_mode] = pose
+    return pose
+
+
+def get_models(static_image_mode: bool = True):
+    """
+    Returns: (yolo, pose)
+    """
+    return get_yolo(), get_pose(static_image_mode)
+
+
+def warm_up():
+    """
+    워커 시작 시(initializer) 호출해서 모델을 미리 올려 둡니다.
+    실패해도 워커 풀이 깨지지 않도록 예외는 상태에만 기록합니다.
+    """
+    try:
+        get_models()
+    except Exception as e:
+        _record("error", message=str(e))
+
+
+def registry_status() -> dict:
+    """
+    스레드별 로드 시간 / 워밍업 여부
+    """
+    with _stats_lock:
+        return {name: {k: dict(v) for k, v in models.items()} for name, models in _stats.items()}
@@ -3,24 +3,109 @@
 import os
 import subprocess
 import numpy as np
-import librosa
 import cv2
 import time
 from scipy.signal import correlate  # FFT-based correlation for speed
 
-def sync_pair(video1_path: str, video2_path: str, out_dir: str, sr: int = 22050):
+# 거친 탐색에 쓰는 에너지 엔벨로프 hop (샘플 수, 22050Hz 기준 약 23ms)
+ENVELOPE_HOP = 512
+# 정밀 보정에 쓰는 원본 오디오 구간 길이 (초)
+REFINE_SECONDS = 10.0
+
+
+def load_audio(video_path: str, sr: int = 22050) -> np.ndarray:
+    """
+    ffmpeg 파이프로 모노 float32 PCM 을 바로 읽어 옵니다 (임시 WAV 없음).
+    """
+    proc = subprocess.run([
+        "ffmpeg", "-v", "error", "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(sr),
+        "-f", "f32le", "-"
+    ], check=True, stdout=subprocess.PIPE)
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def onset_envelope(y: np.ndarray, hop: int = ENVELOPE_HOP) -> np.ndarray:
+    """
+    hop 단위 RMS 에너지의 로그 증가분(onset 세기), 평균 0 / 분산 1 로 정규화
     """
-    두 비디오 파일을 오디오 크로스-상관으로 싱크한 뒤, 똑같은 길이로 잘라
-    *_synced.mp4 두 개를 out_dir에 저장하고 그 경로를 반환합니다.
+    n = len(y) // hop
+    if n < 2:
+        return np.zeros(max(n, 1), dtype=np.float32)
+    frames = y[:n * hop].reshape(n, hop)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-10)
+    onset = np.maximum(np.diff(np.log(rms), prepend=np.log(rms[0])), 0.0)
+    onset -= onset.mean()
+    return (onset / (onset.std() + 1e-8)).astype(np.float32)
+
+
+def estimate_lag(y1: np.ndarray, y2: np.ndarray, sr: int = 22050,
+                 hop: int = ENVELOPE_HOP, refine_seconds: float = REFINE_SECONDS) -> tuple[int, float]:
+    """
+    y1[n + lag] ≈ y2[n] 이 되는 lag(샘플)와 신뢰도(0~1)를 추정합니다.
+      1) 다운샘플된 onset 엔벨로프끼리 전체 크로스-상관 → 대략적인 lag
+      2) 원본 샘플레이트에서 ±2 hop 범위, refine_seconds 길이 구간만 상관 → 정밀 lag
+      3) 정밀 lag 에서 두 구간의 정규화 상관계수를 신뢰도로 사용
+    """
+    e1, e2 = onset_envelope(y1, hop), onset_envelope(y2, hop)
+    corr = correlate(e1, e2, mode="full", method="fft")
+    coarse = (int(np.argmax(corr)) - (len(e2) - 1)) * hop
+
+    # y2 좌표계에서 두 신호가 겹치는 구간
+    win = 2 * hop
+    lo = max(0, -(coarse - win))
+    hi = min(len(y2), len(y1) - (coarse + win))
+    seg = min(int(refine_seconds * sr), hi - lo)
+    if seg < hop:
+        return coarse, 0.0
+    s = lo + (hi - lo - seg) // 2
+
+    ref = y1[s + coarse - win: s + coarse + win + seg]
+    tgt = y2[s: s + seg]
+    fine = correlate(ref, tgt, mode="valid", method="fft")
+    lag = coarse - win + int(np.argmax(fine))
+
+    a = y1[s + lag: s + lag + seg].astype(np.float64)
+    b = tgt.astype(np.float64)
+    confidence = float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+    return lag, max(0.0, confidence)
+
+
+def _cut(src: str, dst: str, ss: float, duration: float, fps: float, sr: int):
+    """
+    한 번의 ffmpeg 호출로 비디오·오디오를 같이 잘라 dst 에 저장 (입력 앞 -ss 로 빠르게 탐색)
+    """
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-ss", f"{ss:.6f}", "-i", src, "-t", f"{duration:.6f}",
+        "-r", str(fps), "-c:v", "libx264", "-preset", "veryfast", "-crf", "18",
+        "-c:a", "aac", "-b:a", "128k", "-ac", "1", "-ar", str(sr),
+        dst
+    ], check=True)
+
+
+def sync_pair(video1_path: str, video2_path: str, out_dir: str, sr: int = 22050,
+              audio1: np.ndarray = None, return_info: bool = False, trim: str = "cut"):
+    """
+    두 비디오 파일을 오디오 크로스-상관으로 싱크합니다.
 
     Args:
       video1_path: 첫 번째 비디오의 전체 경로
       video2_path: 두 번째 비디오의 전체 경로
       out_dir: 결과물을 저장할 디렉토리
       sr: 오디오 샘플링 레이트
+      audio1: 이미 디코딩된 첫 번째 비디오 오디오 (캐시). 주어지면 추출을 건너뜀
+      return_info: True 면 싱크 정보 dict 도 함께 반환
+        (lag, start1, start2, duration, fps, confidence, trim, start_frames, num_frames)
+      trim: "cut"     - 똑같은 길이로 잘라 *_synced.mp4 두 개를 out_dir 에 저장 (영상마다 ffmpeg 한 번)
+            "offsets" - 재인코딩 없이 원본 경로를 그대로 반환. 이후 단계는
+                        info 의 start_frames / num_frames 로 디코더를 seek 해서 사용
+                        (FPS 가 다르면 두 번째 영상만 첫 번째 FPS 로 잘라서 맞춤)
     Returns:
-      (synced1_path, synced2_path)
+      (synced1_path, synced2_path) 또는 (synced1_path, synced2_path, info)
     """
+    if trim not in ("cut", "offsets"):
+        raise ValueError(f"Unsupported trim mode: {trim}")
 
     # 1) 타이머 시작
     start_time = time.time()
@@ -30,34 +115,23 @@ def sync_pair(video1_path: str, video2_path: str, out_dir: str, sr: int = 22050)
     name1 = os.path.splitext(os.path.basename(video1_path))[0]
     name2 = os.path.splitext(os.path.basename(video2_path))[0]
 
-    # 2) 임시 WAV & 결과 비디오 경로
-    wav1 = os.path.join(out_dir, f"{name1}.wav")
-    wav2 = os.path.join(out_dir, f"{name2}.wav")
+    # 2) 결과 비디오 경로
     synced1 = os.path.join(out_dir, f"{name1}_synced.mp4")
     synced2 = os.path.join(out_dir, f"{name2}_synced.mp4")
 
-    # 3) 오디오만 추출
-    for vid_path, wav_path in ((video1_path, wav1), (video2_path, wav2)):
-        subprocess.run([
-            "ffmpeg", "-y", "-i", vid_path,
-            "-vn", "-ac", "1", "-ar", str(sr), wav_path
-        ], check=True)
-
-    # 4) 크로스-상관으로 지연(lag) 계산
-    y1, _ = librosa.load(wav1, sr=sr)
-    y2, _ = librosa.load(wav2, sr=sr)
-    if len(y1) < len(y2):
-        y1 = np.pad(y1, (0, len(y2) - len(y1)))
-    else:
-        y2 = np.pad(y2, (0, len(y1) - len(y2)))
-    corr = correlate(y1, y2, mode="full", method="fft")
-    lag = np.argmax(corr) - (len(y2) - 1)
+    # 3) 오디오만 추출 (ffmpeg 파이프)
+    y1 = audio1 if audio1 is not None else load_audio(video1_path, sr)
+    y2 = load_audio(video2_path, sr)
+
+    # 4) 엔벨로프 → 구간 정밀 보정 순으로 지연(lag) 계산
+    lag, confidence = estimate_lag(y1, y2, sr)
     if lag > 0:
         start1, start2 = lag / sr, 0.0
     else:
         start1, start2 = 0.0, -lag / sr
 
-    print(f"[Sync] {name1} vs {name2} → lag={lag} samples, start1={start1:.3f}s, start2={start2:.3f}s")
+    print(f"[Sync] {name1} vs {name2} → lag={lag} samples, start1={start1:.3f}s, start2={start2:.3f}s, "
+          f"confidence={confidence:.2f}")
 
     # 5) 비디오 정보(프레임 수, FPS) 가져오기
     def get_info(path):
@@ -74,44 +148,30 @@ def sync_pair(video1_path: str, video2_path: str, out_dir: str, sr: int = 22050)
     rem1 = (f1 - start1 * fps1) / fps1
     rem2 = (f2 - start2 * fps2) / fps2
     duration = min(rem1, rem2)
+    num_frames = max(0, int(duration * fps1))
 
-    # 7) 각 비디오·오디오 컷 & 재결합
-    cuts = []
-    for name, vid_path, ss in ((name1, video1_path, start1), (name2, video2_path, start2)):
-        vid_cut = os.path.join(out_dir, f"{name}_cut.mp4")
-        aud_cut = os.path.join(out_dir, f"{name}_cut.wav")
-        cuts.append((vid_cut, aud_cut))
-
-        # 비디오만 컷
-        subprocess.run([
-            "ffmpeg", "-y", "-i", vid_path,
-            "-ss", f"{ss:.6f}", "-t", f"{duration:.6f}",
-            "-r", str(fps1), "-c:v", "libx264",
-            "-preset", "veryfast", "-crf", "18",
-            "-an", vid_cut
-        ], check=True)
-
-        # 오디오만 컷
-        subprocess.run([
-            "ffmpeg", "-y", "-i", vid_path,
-            "-ss", f"{ss:.6f}", "-t", f"{duration:.6f}",
-            "-ac", "1", "-ar", str(sr),
-            "-vn", aud_cut
-        ], check=True)
-
-    # 8) 컷된 비디오 + 오디오 재결합
-    subprocess.run([
-        "ffmpeg", "-y", "-i", cuts[0][0], "-i", cuts[0][1],
-        "-c:v", "copy", "-c:a", "aac", "-b:a", "128k", synced1
-    ], check=True)
-    subprocess.run([
-        "ffmpeg", "-y", "-i", cuts[1][0], "-i", cuts[1][1],
-        "-c:v", "copy", "-c:a", "aac", "-b:a", "128k", synced2
-    ], check=True)
-
-     # 9) 완료 로그 & 실행 시간
+    # 7) 자르기
+    if trim == "cut":
+        _cut(video1_path, synced1, start1, duration, fps1, sr)
+        _cut(video2_path, synced2, start2, duration, fps1, sr)
+        start_frames = [0, 0]
+    else:
+        synced1 = video1_path
+        start_frames = [int(round(start1 * fps1)), int(round(start2 * fps2))]
+        if abs(fps1 - fps2) > 1e-3:
+            _cut(video2_path, synced2, start2, duration, fps1, sr)
+            start_frames[1] = 0
+        else:
+            synced2 = video2_path
+
+    # 8) 완료 로그 & 실행 시간
     elapsed = time.time() - start_time
-    print(f"[Merged] {synced1} , {synced2}")
+    print(f"[Synced/{trim}] {synced1} , {synced2}")
     print(f"[Sync Complete] 총 소요 시간: {elapsed:.2f} 초")
-    
+
+    if return_info:
+        info = {"lag": int(lag), "start1": start1, "start2": start2,
+                "duration": duration, "fps": fps1, "confidence": confidence,
+                "trim": trim, "start_frames": start_frames, "num_frames": num_frames}
+        return synced1, synced2, info
     return synced1, synced2
@@ -1,124 +1,472 @@
 # flask-server/pipeline/extract_keypoints/yolo_and_mediapipe_pose.py
 
 import os
-import logging
-import warnings
 import cv2
 import json
 import csv
-from ultralytics import YOLO
+import numpy as np
 import mediapipe as mp
 from tqdm import tqdm
 
-def extract_keypoints(video_path: str, output_dir: str):
+from .model_registry import get_models
+from ..similarity.data_utils import save_keypoint_store, keypoints_to_records, fill_skipped_frames
+
+# YOLO 를 한 번 호출할 때 넣는 프레임 수
+BATCH_SIZE = int(os.environ.get("YOLO_BATCH_SIZE", 8))
+
+# 추출 모드
+#   detect: 모든 프레임에서 YOLO + MediaPipe(static image)
+#   track : MediaPipe video 모드 + 이전 프레임 랜드마크로 ROI 추적,
+#           YOLO 는 REDETECT_EVERY 프레임마다 또는 가시성이 떨어졌을 때만 실행
+EXTRACT_MODE   = os.environ.get("EXTRACT_MODE", "detect")
+REDETECT_EVERY = int(os.environ.get("REDETECT_EVERY", 30))
+MIN_VISIBILITY = float(os.environ.get("MIN_VISIBILITY", 0.5))
+
+# 기본 저장 형식은 keypoints.npy (+ .vis.npy / .valid.npy). JSON/CSV 는 필요할 때만 추가로 내보냄
+#   예) KEYPOINT_EXPORTS=json,csv
+KEYPOINT_EXPORTS = tuple(f for f in os.environ.get("KEYPOINT_EXPORTS", "").split(",") if f)
+
+# 어노테이션 프레임 JPEG 저장 여부 (렌더링은 저장된 키포인트로 스켈레톤을 다시 그리므로 기본은 저장 안 함)
+SAVE_FRAMES = os.environ.get("SAVE_FRAMES", "0") == "1"
+
+# 프레임 간격 추출 (속도/정확도 조절용)
+#   FRAME_STRIDE  : N 프레임마다 한 번만 포즈 추정, 나머지는 보간 (1 이면 모든 프레임)
+#   ADAPTIVE_STRIDE: 켜면 움직임(썸네일 프레임 차이)이 MOTION_THRESH 를 넘을 때도 바로 추정
+#                    (FRAME_STRIDE 는 최대 간격으로 사용)
+#   SAVE_FRAMES 가 켜져 있으면 둘 다 끔: 저장된 frame_XXXXXX.jpg 가 키포인트 인덱스와
+#   빠짐없이 1:1 로 맞아야 하므로 모든 프레임을 추정하고 어노테이션함
+FRAME_STRIDE    = int(os.environ.get("EXTRACT_STRIDE", 1))
+ADAPTIVE_STRIDE = os.environ.get("EXTRACT_ADAPTIVE", "0") == "1"
+MOTION_THRESH   = float(os.environ.get("EXTRACT_MOTION_THRESH", 6.0))
+if SAVE_FRAMES:
+    FRAME_STRIDE, ADAPTIVE_STRIDE = 1, False
+PERSON_CLS = 0
+NUM_JOINTS = 33
+
+
+class SegmentCapture:
     """
-    video_path: 싱크된 동영상 경로
-    output_dir: keypoints CSV/JSON, annotated frames를 저장할 디렉토리
-    Returns: (csv_path, json_path, frames_dir)
+    cv2.VideoCapture 를 start_frame 으로 seek 하고 num_frames 장까지만 읽게 감싼 것.
+    싱크를 재인코딩 없이 오프셋으로만 넘길 때 추출/렌더링이 같은 구간을 디코딩하기 위함
     """
-    # 1) 출력 폴더 준비
-    os.makedirs(output_dir, exist_ok=True)
-    frames_dir = os.path.join(output_dir, "frames")
-    csv_path   = os.path.join(output_dir, "keypoints.csv")
-    json_path  = os.path.join(output_dir, "keypoints.json")
-    os.makedirs(frames_dir, exist_ok=True)
-
-    # 2) 로그/경고 숨기기
-    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
-    warnings.filterwarnings("ignore")
-    logging.getLogger("ultralytics").setLevel(logging.WARNING)
-
-    # 3) 모델 로드
-    yolo = YOLO("yolov8n.pt")
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(
-        static_image_mode=True,
-        model_complexity=1,
-        enable_segmentation=False,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
 
-    # 4) 프레임별 처리
-    cap = cv2.VideoCapture(video_path)
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-    pbar = tqdm(total=total, desc="Extracting keypoints")
+    def __init__(self, video_path: str, start_frame: int = 0, num_frames: int = None):
+        self.cap = cv2.VideoCapture(video_path)
+        if start_frame > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        available = max(0, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0) - start_frame)
+        self.total = available if num_frames is None else min(available, num_frames)
+        self.remaining = num_frames
+
+    def read(self):
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False, None
+            self.remaining -= 1
+        return self.cap.read()
+
+    def grab(self) -> bool:
+        """
+        디코딩 결과를 꺼내지 않고 한 프레임 넘김
+        """
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+        return self.cap.grab()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class StrideCapture:
+    """
+    SegmentCapture 를 감싸서 포즈를 추정할 프레임만 read() 로 돌려줍니다.
+    건너뛰는 프레임은 grab() 만 하고 (adaptive 면 움직임 판단용으로 디코딩),
+    실제로 돌려준 프레임 인덱스는 self.sampled 에 남깁니다.
+    첫 프레임과 마지막 프레임은 항상 추정 (보간 구간의 양 끝)
+    """
+
+    def __init__(self, cap: SegmentCapture, stride: int, adaptive: bool = False,
+                 motion_thresh: float = MOTION_THRESH):
+        self.cap = cap
+        self.total = cap.total
+        self.stride = max(1, stride)
+        self.adaptive = adaptive
+        self.motion_thresh = motion_thresh
+        self.sampled = []
+        self.count = 0
+        self._last = None
+        self._last_thumb = None
+
+    @staticmethod
+    def _thumb(frame):
+        small = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def read(self):
+        while True:
+            idx = self.count
+            due = (self._last is None or idx - self._last >= self.stride or idx >= self.total - 1)
+            if due or self.adaptive:
+                ret, frame = self.cap.read()
+            else:
+                ret, frame = self.cap.grab(), None
+            if not ret:
+                return False, None
+            self.count += 1
+            if not due and self.adaptive:
+                thumb = self._thumb(frame)
+                due = np.abs(thumb - self._last_thumb).mean() > self.motion_thresh
+            if due:
+                self._last = idx
+                if self.adaptive:
+                    self._last_thumb = self._thumb(frame)
+                self.sampled.append(idx)
+                return True, frame
+
+    def release(self):
+        self.cap.release()
 
-    records = []
-    frame_idx = 0
+
+def best_person_boxes(results) -> np.ndarray:
+    """
+    배치 YOLO 결과에서 프레임마다 confidence 가 가장 높은 사람 박스를 고릅니다.
+    Returns: (B, 4) int 배열 [x1, y1, x2, y2], 사람이 없는 프레임은 -1
+    """
+    B = len(results)
+    best = np.full((B, 4), -1, dtype=np.int64)
+    counts = [len(r.boxes) for r in results]
+    if sum(counts) == 0:
+        return best
+
+    # 배치 전체 박스를 한 배열로 모아서 프레임별 argmax 를 벡터 연산으로 처리
+    cls  = np.concatenate([r.boxes.cls.cpu().numpy() for r in results])
+    conf = np.concatenate([r.boxes.conf.cpu().numpy() for r in results])
+    xyxy = np.concatenate([r.boxes.xyxy.cpu().numpy() for r in results])
+    owner = np.repeat(np.arange(B), counts)
+
+    keep = cls.astype(np.int64) == PERSON_CLS
+    conf, xyxy, owner = conf[keep], xyxy[keep], owner[keep]
+    if owner.size == 0:
+        return best
+
+    # owner 로 정렬하되 같은 프레임 안에서는 conf 오름차순 → 그룹의 마지막이 최대값
+    order = np.lexsort((conf, owner))
+    owner, xyxy = owner[order], xyxy[order]
+    last = np.r_[owner[1:] != owner[:-1], True]
+    best[owner[last]] = xyxy[last].astype(np.int64)
+    return best
+
+
+def _pose_in_box(frame, box, pose, annotated, pad: int = 20):
+    """
+    box 영역(+pad)을 잘라 MediaPipe 로 포즈를 추정합니다.
+    annotated 가 None 이 아니면 어노테이션도 그립니다.
+    Returns: (J, 4) [x, y, z, visibility] 원본 프레임 픽셀 좌표 (포즈가 없으면 None)
+    """
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = box
+    x1m, y1m = max(0, x1 - pad), max(0, y1 - pad)
+    x2m, y2m = min(w, x2 + pad), min(h, y2 + pad)
+
+    roi = frame[y1m:y2m, x1m:x2m]
+    rgb = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
+    res = pose.process(rgb)
+
+    if not res.pose_landmarks:
+        return None
+
+    # 어노테이션
+    if annotated is not None:
+        annotated_roi = roi.copy()
+        mp.solutions.drawing_utils.draw_landmarks(
+            annotated_roi,
+            res.pose_landmarks,
+            mp.solutions.pose.POSE_CONNECTIONS,
+            mp.solutions.drawing_styles.get_default_pose_landmarks_style()
+        )
+        annotated[y1m:y2m, x1m:x2m] = annotated_roi
+
+    # keypoint 기록 (ROI 정규화 좌표 → 원본 픽셀 좌표)
+    pts = np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in res.pose_landmarks.landmark],
+                   dtype=np.float32)
+    pts[:, 0] = x1m + pts[:, 0] * (x2m - x1m)
+    pts[:, 1] = y1m + pts[:, 1] * (y2m - y1m)
+    return pts
+
+
+def _landmark_box(pts: np.ndarray, w: int, h: int, margin: float = 0.25, min_vis: float = 0.3):
+    """
+    이전 프레임 랜드마크를 감싸는 박스(여유 margin 포함)를 다음 프레임 ROI 로 사용
+    """
+    seen = pts[pts[:, 3] >= min_vis]
+    if len(seen) < 4:
+        return None
+    x1, y1 = seen[:, :2].min(axis=0)
+    x2, y2 = seen[:, :2].max(axis=0)
+    mx, my = (x2 - x1) * margin, (y2 - y1) * margin
+    box = np.array([max(0, x1 - mx), max(0, y1 - my), min(w, x2 + mx), min(h, y2 + my)], dtype=np.int64)
+    if box[2] - box[0] < 8 or box[3] - box[1] < 8:
+        return None
+    return box
+
+
+def _iter_detect(cap, yolo, pose, batch_size: int, annotate: bool):
+    """
+    detect 모드: batch_size 장씩 디코딩해서 YOLO 를 한 번 돌리고 프레임별 포즈 추정
+    yields: (frame, annotated, pts)
+    """
+    while True:
+        # batch_size 장 디코딩
+        batch = []
+        while len(batch) < batch_size:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            batch.append(frame)
+        if not batch:
+            return
+
+        # YOLO 한 번으로 배치 전체의 사람 박스 찾기
+        boxes = best_person_boxes(yolo(batch, verbose=False))
+
+        for frame, box in zip(batch, boxes):
+            annotated = frame.copy() if annotate else None
+            pts = _pose_in_box(frame, box, pose, annotated) if box[0] >= 0 else None
+            yield frame, annotated, pts
+
+
+def _iter_track(cap, yolo, pose, redetect_every: int, min_visibility: float, annotate: bool):
+    """
+    track 모드: 이전 프레임 랜드마크에서 ROI 를 잡고 MediaPipe video 모드로 추적.
+    ROI 가 없거나, redetect_every 프레임이 지났거나, 가시성이 떨어지면 YOLO 로 다시 찾음
+    yields: (frame, annotated, pts)
+    """
+    pose.reset()
+    box, since_detect = None, 0
     while True:
         ret, frame = cap.read()
         if not ret:
-            break
-
+            return
         h, w = frame.shape[:2]
-        annotated = frame.copy()
-        rec = {"frame": frame_idx}
-
-        # 4.1) YOLO로 사람 박스 찾기
-        results = yolo(frame)[0]
-        person_boxes = [b for b in results.boxes if int(b.cls) == 0]
-        if person_boxes:
-            best = max(person_boxes, key=lambda b: float(b.conf))
-            x1, y1, x2, y2 = best.xyxy[0].cpu().numpy().astype(int)
-
-            pad = 20
-            x1m, y1m = max(0, x1 - pad), max(0, y1 - pad)
-            x2m, y2m = min(w, x2 + pad), min(h, y2 + pad)
-
-            roi = frame[y1m:y2m, x1m:x2m]
-            rgb = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
-            res = pose.process(rgb)
-
-            if res.pose_landmarks:
-                # 어노테이션
-                annotated_roi = roi.copy()
-                mp.solutions.drawing_utils.draw_landmarks(
-                    annotated_roi,
-                    res.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    mp.solutions.drawing_styles.get_default_pose_landmarks_style()
-                )
-                annotated[y1m:y2m, x1m:x2m] = annotated_roi
-
-                # keypoint 기록
-                for j, lm in enumerate(res.pose_landmarks.landmark):
-                    ox = x1m + lm.x * (x2m - x1m)
-                    oy = y1m + lm.y * (y2m - y1m)
-                    rec[f"x{j}"] = float(ox)
-                    rec[f"y{j}"] = float(oy)
-                    rec[f"z{j}"] = float(lm.z)
-                    rec[f"v{j}"] = float(lm.visibility)
-            else:
-                for j in range(33):
-                    rec[f"x{j}"] = []
-                    rec[f"y{j}"] = []
-                    rec[f"z{j}"] = []
-                    rec[f"v{j}"] = []
-        else:
-            for j in range(33):
-                rec[f"x{j}"] = []
-                rec[f"y{j}"] = []
-                rec[f"z{j}"] = []
-                rec[f"v{j}"] = []
+        annotated = frame.copy() if annotate else None
+        pts = None
 
-        records.append(rec)
-        cv2.imwrite(os.path.join(frames_dir, f"frame_{frame_idx:06d}.jpg"), annotated)
+        tracked = box is not None and since_detect < redetect_every
+        if tracked:
+            pts = _pose_in_box(frame, box, pose, annotated)
+            if pts is None or pts[:, 3].mean() < min_visibility:
+                # 추적 실패 → 같은 프레임에서 바로 재검출
+                annotated = frame.copy() if annotate else None
+                pts, tracked = None, False
+
+        if not tracked:
+            det = best_person_boxes(yolo([frame], verbose=False))[0]
+            since_detect = 0
+            pose.reset()
+            if det[0] >= 0:
+                pts = _pose_in_box(frame, det, pose, annotated)
+
+        box = _landmark_box(pts, w, h) if pts is not None else None
+        since_detect += 1
+        yield frame, annotated, pts
+
+
+def _extract_arrays(video_path: str, start_frame: int, num_frames: int, mode: str,
+                    batch_size: int, redetect_every: int, min_visibility: float,
+                    frames_dir: str = None, skip: int = 0, frame_base: int = 0,
+                    stride: int = 1, adaptive: bool = False):
+    """
+    [start_frame, start_frame + num_frames) 구간을 디코딩하며 포즈를 추정합니다.
+    앞쪽 skip 장은 추적 상태를 맞추기 위한 워밍업으로만 쓰고 결과에서 뺍니다.
+    frames_dir 가 있으면 어노테이션 프레임을 frame_{frame_base + i:06d}.jpg 로 저장
+    stride / adaptive: 일부 프레임만 추정하고 나머지는 보간 (StrideCapture 참고).
+      frames_dir 가 있으면 무시 (저장한 프레임이 키포인트 인덱스와 빠짐없이 맞도록 모든 프레임 추정)
+    Returns: kp (T, J, 3), vis (T, J), valid (T,), estimated (T,) — 모두 전체 프레임 기준
+    """
+    if mode not in ("detect", "track"):
+        raise ValueError(f"Unsupported extract mode: {mode}")
 
-        frame_idx += 1
-        pbar.update(1)
+    # 모델은 레지스트리에서 (스레드당 한 번만 로드/워밍업)
+    yolo, pose = get_models(static_image_mode=(mode == "detect"))
+
+    cap = SegmentCapture(video_path, start_frame, num_frames)
+    if frames_dir is None and (stride > 1 or adaptive):
+        cap = StrideCapture(cap, stride, adaptive)
+    pbar = tqdm(total=cap.total, desc="Extracting keypoints")
+    annotate = frames_dir is not None
+
+    if mode == "track":
+        frames = _iter_track(cap, yolo, pose, redetect_every, min_visibility, annotate)
+    else:
+        frames = _iter_detect(cap, yolo, pose, batch_size, annotate)
+
+    kp, vis, valid = [], [], []
+    for frame, annotated, pts in frames:
+        if pts is not None:
+            kp.append(pts[:, :3])
+            vis.append(pts[:, 3])
+        else:
+            kp.append(np.zeros((NUM_JOINTS, 3), dtype=np.float32))
+            vis.append(np.zeros(NUM_JOINTS, dtype=np.float32))
+        valid.append(pts is not None)
+        i = cap.sampled[len(valid) - 1] if isinstance(cap, StrideCapture) else len(valid) - 1
+        if annotate and i >= skip:
+            cv2.imwrite(os.path.join(frames_dir, f"frame_{frame_base + i - skip:06d}.jpg"), annotated)
+        pbar.update(i + 1 - pbar.n)
 
     pbar.close()
     cap.release()
-    pose.close()
 
-    # 5) CSV & JSON 저장
-    with open(csv_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=records[0].keys())
-        writer.writeheader()
-        writer.writerows(records)
+    kp    = np.stack(kp) if kp else np.zeros((0, NUM_JOINTS, 3), dtype=np.float32)
+    vis   = np.stack(vis) if vis else np.zeros((0, NUM_JOINTS), dtype=np.float32)
+    valid = np.array(valid, dtype=bool)
+    estimated = np.ones(len(valid), dtype=bool)
+
+    # 건너뛴 프레임은 전체 타임라인에 펼친 뒤 추정한 프레임 사이를 보간
+    if isinstance(cap, StrideCapture):
+        T = cap.count
+        full_kp  = np.zeros((T, NUM_JOINTS, 3), dtype=np.float32)
+        full_vis = np.zeros((T, NUM_JOINTS), dtype=np.float32)
+        full_valid = np.zeros(T, dtype=bool)
+        estimated  = np.zeros(T, dtype=bool)
+        sampled = np.asarray(cap.sampled[:len(valid)], dtype=np.int64)
+        full_kp[sampled], full_vis[sampled], full_valid[sampled] = kp, vis, valid
+        estimated[sampled] = True
+        kp, vis, valid = fill_skipped_frames(full_kp, full_vis, full_valid, estimated)
+
+    return kp[skip:], vis[skip:], valid[skip:], estimated[skip:]
+
+
+def _save_outputs(output_dir: str, kp: np.ndarray, vis: np.ndarray, valid: np.ndarray,
+                  estimated: np.ndarray, exports: tuple):
+    """
+    keypoints.npy (+ .vis.npy / .valid.npy / .estimated.npy) 와 (옵션) CSV/JSON 을 저장
+    Returns: (csv_path 또는 None, keypoints_path)
+    """
+    csv_path  = os.path.join(output_dir, "keypoints.csv")
+    json_path = os.path.join(output_dir, "keypoints.json")
+    kp_path   = os.path.join(output_dir, "keypoints.npy")
+
+    # 바이너리 저장 (T, 33, 3) / (T, 33) / (T,)
+    save_keypoint_store(kp_path, kp, vis, valid, estimated)
+
+    # (옵션) CSV & JSON 내보내기 — 예전 형식 그대로
+    if "csv" in exports or "json" in exports:
+        records = keypoints_to_records(kp, vis, valid)
+    if "csv" in exports and records:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=records[0].keys())
+            writer.writeheader()
+            writer.writerows(records)
+    if "json" in exports:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
 
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(records, f, ensure_ascii=False, indent=2)
+    return (csv_path if "csv" in exports else None), kp_path
 
-    return csv_path, json_path, frames_dir
+
+def extract_keypoints(
+    video_path: str,
+    output_dir: str,
+    batch_size: int = BATCH_SIZE,
+    mode: str = EXTRACT_MODE,
+    redetect_every: int = REDETECT_EVERY,
+    min_visibility: float = MIN_VISIBILITY,
+    save_frames: bool = SAVE_FRAMES,
+    exports: tuple = KEYPOINT_EXPORTS,
+    start_frame: int = 0,
+    num_frames: int = None,
+    stride: int = FRAME_STRIDE,
+    adaptive: bool = ADAPTIVE_STRIDE
+):
+    """
+    video_path: 싱크된 동영상 경로
+    output_dir: keypoints(.npy / CSV / JSON), annotated frames를 저장할 디렉토리
+    batch_size: (detect 모드) YOLO 한 번에 넣을 프레임 수
+    mode: "detect" 또는 "track" (출력 JSON 형식은 동일)
+    redetect_every / min_visibility: (track 모드) YOLO 재검출 주기와 기준 가시성
+    save_frames: 어노테이션 프레임 JPEG 저장 여부
+    exports: 추가로 내보낼 형식 ("json", "csv")
+    start_frame / num_frames: 이 구간만 추출 (sync_pair 의 offsets 모드에서 원본 영상을 seek)
+    stride / adaptive: N 프레임마다(또는 움직임이 클 때) 추정하고 나머지는 보간.
+      결과는 항상 전체 프레임 타임라인이며 keypoints.estimated.npy 에 실제 추정한 프레임이 표시됨
+      (save_frames 이면 모든 프레임을 추정하므로 무시)
+    Returns: (csv_path, keypoints_path, frames_dir)
+      keypoints_path 는 keypoints.npy (load_pose_keypoints 로 읽음).
+      CSV 를 내보내지 않으면 csv_path, 프레임을 저장하지 않으면 frames_dir 은 None
+    """
+    # 1) 출력 폴더 준비
+    os.makedirs(output_dir, exist_ok=True)
+    frames_dir = os.path.join(output_dir, "frames")
+    if save_frames:
+        os.makedirs(frames_dir, exist_ok=True)
+
+    # 2~4) 프레임 처리
+    kp, vis, valid, estimated = _extract_arrays(
+        video_path, start_frame, num_frames, mode, batch_size, redetect_every, min_visibility,
+        frames_dir=frames_dir if save_frames else None, stride=stride, adaptive=adaptive
+    )
+
+    # 5~6) 저장
+    csv_path, kp_path = _save_outputs(output_dir, kp, vis, valid, estimated, exports)
+    return csv_path, kp_path, (frames_dir if save_frames else None)
+
+
+# ---- 구간 병렬 추출 ----
+
+def plan_segments(total: int, segment_frames: int, warmup: int) -> list[tuple[int, int, int]]:
+    """
+    total 프레임을 segment_frames 길이 구간으로 나눕니다.
+    Returns: [(구간 시작, 구간 길이, 앞쪽 워밍업 프레임 수), ...]  (시작은 추출 범위 기준)
+    """
+    segments = []
+    for seg_start in range(0, total, max(1, segment_frames)):
+        seg_len = min(segment_frames, total - seg_start)
+        segments.append((seg_start, seg_len, min(warmup, seg_start)))
+    return segments
+
+
+def extract_segment(
+    video_path: str,
+    start_frame: int,
+    num_frames: int,
+    warmup: int = 0,
+    frame_base: int = 0,
+    frames_dir: str = None,
+    batch_size: int = BATCH_SIZE,
+    mode: str = EXTRACT_MODE,
+    redetect_every: int = REDETECT_EVERY,
+    min_visibility: float = MIN_VISIBILITY,
+    stride: int = FRAME_STRIDE,
+    adaptive: bool = ADAPTIVE_STRIDE
+):
+    """
+    워커 프로세스에서 한 구간만 추출합니다.
+    start_frame 보다 warmup 장 앞에서 디코딩을 시작해 track 모드의 ROI / MediaPipe 상태를
+    이어 받은 것처럼 맞춘 뒤, 그 워밍업 프레임 결과는 버립니다.
+    Returns: (kp, vis, valid, estimated) — 길이 num_frames
+    """
+    return _extract_arrays(
+        video_path, start_frame - warmup, num_frames + warmup, mode, batch_size,
+        redetect_every, min_visibility, frames_dir=frames_dir, skip=warmup, frame_base=frame_base,
+        stride=stride, adaptive=adaptive
+    )
+
+
+def save_segments(output_dir: str, parts: list, exports: tuple = KEYPOINT_EXPORTS,
+                  save_frames: bool = SAVE_FRAMES):
+    """
+    구간 순서대로 정렬된 (kp, vis, valid, estimated) 결과를 이어 붙여 extract_keypoints 와 같은 형태로 저장
+    Returns: (csv_path, keypoints_path, frames_dir)
+    """
+    kp    = np.concatenate([p[0] for p in parts]) if parts else np.zeros((0, NUM_JOINTS, 3), dtype=np.float32)
+    vis   = np.concatenate([p[1] for p in parts]) if parts else np.zeros((0, NUM_JOINTS), dtype=np.float32)
+    valid = np.concatenate([p[2] for p in parts]) if parts else np.zeros(0, dtype=bool)
+    estimated = np.concatenate([p[3] for p in parts]) if parts else np.zeros(0, dtype=bool)
+    csv_path, kp_path = _save_outputs(output_dir, kp, vis, valid, estimated, exports)
+    return csv_path, kp_path, (os.path.join(output_dir, "frames") if save_frames else None)
@@ -1,6 +1,9 @@
+import os
 import json
 import numpy as np
 from typing import Tuple
+from scipy.ndimage import uniform_filter1d
+from scipy.signal import savgol_filter
 from .constants import JOINT_NAMES
 
 def load_mediapipe_json(path: str) -> Tuple[np.ndarray, np.ndarray]:
@@ -37,39 +40,208 @@ def load_mediapipe_json(path: str) -> Tuple[np.ndarray, np.ndarray]:
     return kp, vis
 
 
+def _store_paths(path: str) -> Tuple[str, str, str]:
+    stem = path[:-len('.npy')] if path.endswith('.npy') else path
+    return stem + '.npy', stem + '.vis.npy', stem + '.valid.npy'
+
+
+def _estimated_path(path: str) -> str:
+    stem = path[:-len('.npy')] if path.endswith('.npy') else path
+    return stem + '.estimated.npy'
+
+
+def save_keypoint_store(path: str, kp: np.ndarray, vis: np.ndarray, valid: np.ndarray,
+                        estimated: np.ndarray = None) -> str:
+    """
+    Save keypoints as raw .npy arrays next to each other:
+      <stem>.npy           float32 (T, J, 3)
+      <stem>.vis.npy       float32 (T, J)
+      <stem>.valid.npy     bool    (T,)   frames where a pose was detected (or interpolated)
+      <stem>.estimated.npy bool    (T,)   frames that went through the pose model
+                                          (only written when some frames were interpolated instead)
+    Returns the path of the keypoint array.
+    """
+    kp_path, vis_path, valid_path = _store_paths(path)
+    np.save(kp_path, np.asarray(kp, dtype=np.float32))
+    np.save(vis_path, np.asarray(vis, dtype=np.float32))
+    np.save(valid_path, np.asarray(valid, dtype=bool))
+    if estimated is not None and not np.all(estimated):
+        np.save(_estimated_path(path), np.asarray(estimated, dtype=bool))
+    elif os.path.isfile(_estimated_path(path)):
+        # left over from an earlier run into the same directory
+        os.remove(_estimated_path(path))
+    return kp_path
+
+
+def keypoint_store_files(path: str) -> list:
+    """
+    Paths of the files that make up a keypoint store (only those that exist).
+    """
+    return [p for p in (*_store_paths(path), _estimated_path(path)) if os.path.isfile(p)]
+
+
+def load_keypoint_store(path: str, mmap: bool = True) -> dict:
+    """
+    Load a keypoint store written by save_keypoint_store.
+    With mmap=True the arrays are memory-mapped read-only (no copy until touched).
+    Returns dict with 'kp' (T, J, 3), 'vis' (T, J), 'valid' (T,), 'estimated' (T,).
+    """
+    mode = 'r' if mmap else None
+    kp_path, vis_path, valid_path = _store_paths(path)
+    est_path = _estimated_path(path)
+    valid = np.load(valid_path, mmap_mode=mode)
+    return {
+        'kp':        np.load(kp_path, mmap_mode=mode),
+        'vis':       np.load(vis_path, mmap_mode=mode),
+        'valid':     valid,
+        'estimated': (np.load(est_path, mmap_mode=mode) if os.path.isfile(est_path)
+                      else np.ones(len(valid), dtype=bool)),
+    }
+
+
+def load_pose_keypoints(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load keypoints and visibility from either a binary store (.npy) or a legacy MediaPipe JSON file.
+    """
+    if path.endswith('.npy'):
+        store = load_keypoint_store(path)
+        return store['kp'], store['vis']
+    return load_mediapipe_json(path)
+
+
+def keypoints_to_records(kp: np.ndarray, vis: np.ndarray, valid: np.ndarray) -> list[dict]:
+    """
+    Convert arrays back to the per-frame JSON/CSV record layout
+    ({"frame", "x0", "y0", "z0", "v0", ...}, empty lists for missing frames).
+    """
+    T, J, _ = kp.shape
+    records = []
+    for t in range(T):
+        rec = {"frame": t}
+        for j in range(J):
+            if valid[t]:
+                rec[f"x{j}"] = float(kp[t, j, 0])
+                rec[f"y{j}"] = float(kp[t, j, 1])
+                rec[f"z{j}"] = float(kp[t, j, 2])
+                rec[f"v{j}"] = float(vis[t, j])
+            else:
+                rec[f"x{j}"] = rec[f"y{j}"] = rec[f"z{j}"] = rec[f"v{j}"] = []
+        records.append(rec)
+    return records
+
+
 def interpolate_missing(kp: np.ndarray, vis: np.ndarray) -> np.ndarray:
+    """
+    Linearly interpolate frames where vis <= 0, per joint, over the whole (T, J, C) tensor at once.
+    Frames before the first / after the last visible one take that frame's value (like np.interp);
+    joints with fewer than 2 visible frames are left unchanged.
+    """
     T, J, C = kp.shape
-    kp_interp = kp.copy()
-    for j in range(J):
-        valid = vis[:, j] > 0
-        if valid.sum() < 2:
-            continue
-        times = np.arange(T)
-        for c in range(C):
-            kp_interp[:, j, c] = np.interp(times, times[valid], kp[valid, j, c])
-    return kp_interp
-
-
-def smooth_keypoints(kp: np.ndarray, window: int = 5) -> np.ndarray:
-    T, J, C = kp.shape
-    kp_smooth = np.zeros_like(kp)
-    for j in range(J):
-        for c in range(C):
-            series = kp[:, j, c]
-            kernel = np.ones(window) / window
-            kp_smooth[:, j, c] = np.convolve(series, kernel, mode='same')
-    return kp_smooth
-
-def normalize_keypoints(kp: np.ndarray) -> np.ndarray:
+    out = np.array(kp, dtype=np.float32)
+    valid = np.asarray(vis) > 0                                   # (T, J)
+    use = valid.sum(axis=0) >= 2                                  # (J,)
+    if T == 0 or not use.any():
+        return out
+
+    # nearest visible frame at or before / at or after each t
+    t = np.arange(T)[:, None]
+    prev = np.maximum.accumulate(np.where(valid, t, -1), axis=0)
+    nxt  = np.minimum.accumulate(np.where(valid, t, T)[::-1], axis=0)[::-1]
+    prev, nxt = np.where(prev < 0, nxt, prev), np.where(nxt >= T, prev, nxt)
+    prev, nxt = np.clip(prev, 0, T - 1), np.clip(nxt, 0, T - 1)
+
+    span = nxt - prev
+    w = np.divide(t - prev, span, out=np.zeros((T, J), dtype=np.float32), where=span > 0)
+
+    joints = np.arange(J)
+    lo = out[prev, joints]                                        # (T, J, C)
+    interp = out[nxt, joints]
+    interp -= lo
+    interp *= w[:, :, None]
+    interp += lo
+    out[:, use] = interp[:, use]
+    return out
+
+
+def fill_skipped_frames(kp: np.ndarray, vis: np.ndarray, valid: np.ndarray,
+                        estimated: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fill frames that were not run through the pose model (estimated == False) by
+    interpolating keypoints and visibility between estimated frames with a detected pose.
+    A skipped frame is only filled when the nearest estimated frame on each side found a pose;
+    otherwise (gap in detection, or before the first/after the last estimated frame) it stays missing.
+    Returns (kp, vis, valid) at the full frame rate.
+    """
+    T = len(kp)
+    anchor = estimated & valid
+    skipped = ~estimated
+    if not skipped.any() or anchor.sum() < 2:
+        return kp, vis, valid & estimated
+
+    anchor_vis = np.where(anchor[:, None], vis, 0.0)
+    kp_fill  = interpolate_missing(kp, anchor_vis)
+    vis_fill = interpolate_missing(vis[:, :, None], anchor_vis)[:, :, 0]
+
+    # nearest estimated frame before / after every frame
+    idx = np.arange(T)
+    prev = np.maximum.accumulate(np.where(estimated, idx, -1))
+    nxt  = np.minimum.accumulate(np.where(estimated, idx, T)[::-1])[::-1]
+    has_both = (prev >= 0) & (nxt < T)
+    inside = (skipped & has_both
+              & anchor[np.clip(prev, 0, T - 1)] & anchor[np.clip(nxt, 0, T - 1)])
+    kp    = np.where(inside[:, None, None], kp_fill, kp)
+    vis   = np.where(inside[:, None], vis_fill, vis)
+    valid = (valid & estimated) | inside
+    return kp.astype(np.float32), vis.astype(np.float32), valid
+
+
+# Temporal smoothing applied by preprocess_keypoints (part of the scoring settings, see similarity_settings)
+SMOOTH_WINDOW = 5
+SMOOTH_METHOD = "mean"
+
+
+def smooth_keypoints(kp: np.ndarray, window: int = 5, method: str = "mean") -> np.ndarray:
+    """
+    Filter every joint/channel along the time axis in one pass.
+      method="mean"  : moving average, edges padded with the nearest frame (no pull towards 0)
+      method="savgol": Savitzky-Golay (polyorder 2), edges fitted by polynomial interpolation
+    """
+    kp = np.asarray(kp, dtype=np.float32)
+    T = len(kp)
+    if T == 0 or window <= 1:
+        return kp.copy()
+    if method == "savgol":
+        win = min(window | 1, T if T % 2 else T - 1)
+        if win <= 2:
+            return kp.copy()
+        return savgol_filter(kp, win, 2, axis=0, mode="interp").astype(np.float32)
+    if method != "mean":
+        raise ValueError(f"Unsupported smoothing method: {method}")
+    return uniform_filter1d(kp, size=window, axis=0, mode="nearest")
+
+
+def normalize_keypoints(kp: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Center every frame on the hip midpoint and scale by the hip-to-shoulder distance.
+    Pass out=kp to normalize in place.
+    """
     left_hip = JOINT_NAMES.index('left_hip')
     right_hip = JOINT_NAMES.index('right_hip')
     left_shoulder = JOINT_NAMES.index('left_shoulder')
     right_shoulder = JOINT_NAMES.index('right_shoulder')
-    T, J, C = kp.shape
-    kp_norm = np.zeros_like(kp)
-    for t in range(T):
-        root = (kp[t, left_hip] + kp[t, right_hip]) * 0.5
-        shoulder = (kp[t, left_shoulder] + kp[t, right_shoulder]) * 0.5
-        height = np.linalg.norm(shoulder - root) + 1e-6
-        kp_norm[t] = (kp[t] - root) / height
-    return kp_norm
+    kp = np.asarray(kp, dtype=np.float32)
+    root = (kp[:, left_hip] + kp[:, right_hip]) * 0.5                       # (T, C)
+    shoulder = (kp[:, left_shoulder] + kp[:, right_shoulder]) * 0.5
+    height = np.linalg.norm(shoulder - root, axis=1) + 1e-6                 # (T,)
+    out = np.subtract(kp, root[:, None], out=out)
+    out /= height[:, None, None]
+    return out
+
+
+def preprocess_keypoints(kp_raw: np.ndarray, vis: np.ndarray, window: int = SMOOTH_WINDOW,
+                         method: str = SMOOTH_METHOD) -> np.ndarray:
+    """
+    Missing-frame interpolation -> temporal smoothing -> normalization, float32 (T, J, 3).
+    """
+    kp = smooth_keypoints(interpolate_missing(kp_raw, vis), window, method)
+    return normalize_keypoints(kp, out=kp)
@@ -1,5 +1,5 @@
 import numpy as np
-from .angle_utils import calc_interior_angles_2d, calc_signed_bend_angles_2d
+from .angle_utils import calc_interior_angles_2d
 from .angle_utils import ANGLE_IDX
 
 # Korean labels corresponding to ANGLE_JOINTS order
@@ -23,8 +23,9 @@ def generate_frame_feedback(
     kp_user: np.ndarray,
     angle_thresh: float = np.deg2rad(5),
     direction_thresh: float = 0.2,
-    reverse_thresh_deg: float = 20.0
-
+    reverse_thresh_deg: float = 20.0,
+    ref_ang: np.ndarray = None,
+    user_ang: np.ndarray = None
 ) -> list[str]:
     """
     1) 손목(2,3), 발목(6,7) 제외
@@ -33,14 +34,15 @@ def generate_frame_feedback(
        - 어깨:     user_ang<ref_ang→팔을 올리세요, >→팔을 내리세요
        - 골반:     user_ang<ref_ang→골반 각도가 넓습니다, >→골반 각도가 좁습니다
     3) 메시지 형식: "{label}를 {action} – 선생님 {teacher_deg:.1f}° / 학생 {student_deg:.1f}°"
+    ref_ang/user_ang: 여러 프레임을 한 번에 계산해 둔 interior angle (M,) — 주어지면 다시 계산하지 않음
     """
 
-    # interior angles & signed bend (rad)
-    ref_ang   = calc_interior_angles_2d(kp_ref[None])[0]
-    user_ang  = calc_interior_angles_2d(kp_user[None])[0]
-    # (signed bend는 벡터 방향 차이 확인용, interior만 매핑하므로 사실 미사용)
-    ref_bend  = calc_signed_bend_angles_2d(kp_ref[None])[0]
-    user_bend = calc_signed_bend_angles_2d(kp_user[None])[0]
+    # interior angles (rad)
+    # (signed bend는 벡터 방향 차이 확인용이었으나 interior만 매핑하므로 계산하지 않음)
+    if ref_ang is None:
+        ref_ang  = calc_interior_angles_2d(kp_ref[None])[0]
+    if user_ang is None:
+        user_ang = calc_interior_angles_2d(kp_user[None])[0]
 
     feedback = []
 
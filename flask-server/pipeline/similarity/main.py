@@ -4,37 +4,137 @@ import os
 import json
 import numpy as np
 
-from .data_utils      import load_mediapipe_json
+from .data_utils      import load_pose_keypoints
 from .angle_utils     import calc_interior_angles_2d, angle_diff
-from .similarity_utils import compute_frame_similarities, aggregate_per_second, identify_misaligned_joints
+from .similarity_utils import (
+    compute_frame_similarities, combine_scores, aggregate_per_second, identify_misaligned_joints,
+    ALIGNMENT, DTW_BAND
+)
 from .feedback_utils  import generate_frame_feedback
-from .data_utils import normalize_keypoints, smooth_keypoints, interpolate_missing
+from .data_utils import preprocess_keypoints, SMOOTH_WINDOW, SMOOTH_METHOD
 
-def compute_feedback(
+# compute_feedback 가 out_dir 에 남기는 프레임별 배열 (재채점용)
+SIMILARITY_FILE = "similarity.npz"
+# 전처리(보간/정규화)나 유사도 계산 방식을 바꾸면 올려서 이전 결과를 재사용하지 않게 함
+SIMILARITY_VERSION = 1
+
+
+def similarity_settings() -> dict:
+    """
+    점수에 영향을 주는 유사도 단계 설정 (중복 요청 판단 / 단계 기록 지문에 사용)
+    """
+    return {
+        'version':   SIMILARITY_VERSION,
+        'smooth':    [SMOOTH_WINDOW, SMOOTH_METHOD],
+        'alignment': ALIGNMENT,
+        'dtw_band':  DTW_BAND if ALIGNMENT == "dtw" else None,
+    }
+
+
+def load_keypoints(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    keypoints(.npy 또는 예전 JSON)를 읽어 (원본, visibility, 전처리된 키포인트)를 반환
+    """
+    kp_raw, vis = load_pose_keypoints(path)
+    return kp_raw, vis, preprocess_keypoints(kp_raw, vis)
+
+
+def compute_similarity(
     ref_json: str,
     user_json: str,
+    ref_data: tuple = None,
+    alignment: str = ALIGNMENT,
+    out_dir: str = None
+) -> dict:
+    """
+     재채점에 필요한 프레임별 배열을 계산합니다 (추출 결과 → 전처리 → 정렬 → 각도/Procrustes).
+     ref_data: 캐시에서 가져온 (원본, visibility, 전처리된) 레퍼런스 키포인트. 주어지면 ref_json 은 읽지 않음
+     out_dir: 주어지면 같은 내용을 similarity.npz 로 저장 (POST /compare/<job_id>/rescore 에서 사용)
+     Returns: dict (SIMILARITY_FILE 의 배열들)
+    """
+    # 1~2) 원본 로드 & 전처리
+    if ref_data is not None:
+        kp_ref_raw, vis_ref, kp_ref = ref_data
+    else:
+        kp_ref_raw, vis_ref, kp_ref = load_keypoints(ref_json)
+    kp_user_raw, vis_user, kp_user = load_keypoints(user_json)
+
+    # 싱크 후에도 프레임 수가 1~2개 다를 수 있어 짧은 쪽에 맞춤 (DTW 는 길이가 달라도 됨)
+    if alignment == "frame":
+        T = min(len(kp_ref), len(kp_user))
+        kp_ref_raw, vis_ref, kp_ref    = kp_ref_raw[:T], vis_ref[:T], kp_ref[:T]
+        kp_user_raw, vis_user, kp_user = kp_user_raw[:T], vis_user[:T], kp_user[:T]
+
+    # 3) 유사도 계산 + 피드백용 interior angle (원본 좌표 기준)
+    sim = similarity_from_features(kp_ref_raw, kp_ref, kp_user_raw, kp_user, alignment)
+    sim.update(vis_ref=vis_ref, vis_user=vis_user)
+    sim = {k: np.asarray(v) for k, v in sim.items()}
+
+    if out_dir is not None:
+        tmp = os.path.join(out_dir, "similarity.tmp.npz")
+        np.savez(tmp, **sim)
+        os.replace(tmp, os.path.join(out_dir, SIMILARITY_FILE))
+    return sim
+
+
+def similarity_from_features(kp_ref_raw, kp_ref, kp_user_raw, kp_user, alignment: str = ALIGNMENT) -> dict:
+    """
+    전처리까지 끝난 키포인트에서 정렬/각도/Procrustes 배열만 다시 계산 (정렬 방식을 바꿔 재채점할 때)
+    """
+    res = compute_frame_similarities(kp_ref, kp_user, alignment=alignment)
+    return {
+        "alignment":   np.array(alignment),
+        "kp_ref_raw":  kp_ref_raw,
+        "kp_user_raw": kp_user_raw,
+        "kp_ref":      kp_ref,
+        "kp_user":     kp_user,
+        "user_index":  res['user_index'],
+        "angle_diffs": res['angle_diffs'],
+        "proc_dists":  res['proc_dists'],
+        "move":        res['move'],
+        "ref_angs":    calc_interior_angles_2d(kp_ref_raw),
+        "user_angs":   calc_interior_angles_2d(kp_user_raw),
+    }
+
+
+def trim_to_common_length(sim: dict) -> dict:
+    """
+    DTW 로 계산된 결과를 frame 정렬로 다시 계산할 때, 저장된 레퍼런스/연습생 배열을 짧은 쪽 길이에 맞춤
+    (compute_similarity 의 frame 모드와 같은 처리)
+    """
+    T = min(len(sim['kp_ref']), len(sim['kp_user']))
+    for side in ('ref', 'user'):
+        for name in (f'kp_{side}_raw', f'kp_{side}', f'vis_{side}'):
+            sim[name] = sim[name][:T]
+    return sim
+
+
+def load_similarity(path: str) -> dict:
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def score_feedback(
+    sim: dict,
+    out_dir: str,
     fps: int = 30,
+    angle_weight: float = 0.6,
     angle_report_thresh: float = 10.0,
-    proc_thresh: float = 0.1
+    proc_thresh: float = 0.1,
+    percentile: float = 95.0
 ) -> tuple[str, str]:
     """
-     ref_json/user_json: keypoints JSON 경로
+     compute_similarity 결과로 점수와 피드백 메시지만 계산해 out_dir 에 저장
+     percentile: 이 백분위수보다 각도 차이가 큰 관절이 있는 프레임을 피드백 대상으로 봄
      실행 후 (feedback.json 경로, scores.json 경로)를 반환
     """
-    # 1) 원본 로드
-    kp_ref_raw, vis_ref   = load_mediapipe_json(ref_json)
-    kp_user_raw, vis_user = load_mediapipe_json(user_json)
-
-    # 2) 전처리
-    kp_ref  = normalize_keypoints(smooth_keypoints(interpolate_missing(kp_ref_raw, vis_ref)))
-    kp_user = normalize_keypoints(smooth_keypoints(interpolate_missing(kp_user_raw, vis_user)))
+    kp_ref_raw, kp_user_raw = sim['kp_ref_raw'], sim['kp_user_raw']
+    user_index = sim['user_index']
 
-    # 3) 유사도 계산
-    res = compute_frame_similarities(kp_ref, kp_user, angle_weight=0.6)
     # 4) 차이가 큰 프레임/관절 탐지
-    dyn_thresh = np.percentile(res['angle_diffs'].flatten(), 95)
+    dyn_thresh = np.percentile(sim['angle_diffs'].flatten(), percentile)
     bad_frames, _ = identify_misaligned_joints(
-        res['angle_diffs'], res['proc_dists'],
+        sim['angle_diffs'], sim['proc_dists'],
         angle_thresh=dyn_thresh,
         proc_thresh=proc_thresh
     )
@@ -43,27 +143,57 @@ def compute_feedback(
     angle_rad = np.deg2rad(angle_report_thresh)
     feedback = {}
     for t in bad_frames:
-        msgs = generate_frame_feedback(kp_ref_raw[t], kp_user_raw[t], angle_thresh=angle_rad)
-        feedback[t] = msgs
+        u = user_index[t]
+        msgs = generate_frame_feedback(
+            kp_ref_raw[t], kp_user_raw[u], angle_thresh=angle_rad,
+            ref_ang=sim['ref_angs'][t], user_ang=sim['user_angs'][u]
+        )
+        feedback[int(t)] = msgs
 
     # 6) 저장 및 경로 반환
-    feedback_path = os.path.join(os.path.dirname(ref_json), "feedback.json")
+    os.makedirs(out_dir, exist_ok=True)
+    feedback_path = os.path.join(out_dir, "feedback.json")
     with open(feedback_path, 'w', encoding='utf-8') as f:
-        json.dump(feedback, f, ensure_ascii=False, indent=2)
+        json.dump(feedback, f, ensure_ascii=False, separators=(',', ':'))
 
 
     # 7) 유사도 점수 JSON 저장
     #    frame별 최종 final_scores 와 초별 sec_scores
-    final_scores = res['final']
+    _, final_scores = combine_scores(sim['angle_diffs'], sim['proc_dists'], sim['move'], angle_weight)
     sec_scores   = aggregate_per_second(final_scores, fps)
     scores_dict = {
         "frame_scores": final_scores.tolist(),
         "second_scores": sec_scores.tolist()
     }
-    scores_path = os.path.join(os.path.dirname(ref_json), "scores.json")
+    scores_path = os.path.join(out_dir, "scores.json")
     with open(scores_path, 'w', encoding='utf-8') as f:
-        json.dump(scores_dict, f, ensure_ascii=False, indent=2)
+        json.dump(scores_dict, f, ensure_ascii=False, separators=(',', ':'))
 
     return feedback_path, scores_path
 
 
+def compute_feedback(
+    ref_json: str,
+    user_json: str,
+    fps: int = 30,
+    angle_report_thresh: float = 10.0,
+    proc_thresh: float = 0.1,
+    ref_data: tuple = None,
+    out_dir: str = None,
+    alignment: str = ALIGNMENT,
+    angle_weight: float = 0.6,
+    percentile: float = 95.0
+) -> tuple[str, str]:
+    """
+     ref_json/user_json: keypoints 경로 (.npy 또는 JSON)
+     ref_data: 캐시에서 가져온 (원본, visibility, 전처리된) 레퍼런스 키포인트. 주어지면 ref_json 은 읽지 않음
+     out_dir: 결과 저장 폴더 (기본값: ref_json 이 있는 폴더). similarity.npz 도 같이 저장됨
+     alignment: "frame" 또는 "dtw" (연습생이 조금 빠르거나 늦어도 같은 동작끼리 비교)
+     실행 후 (feedback.json 경로, scores.json 경로)를 반환
+    """
+    out_dir = out_dir or os.path.dirname(ref_json)
+    sim = compute_similarity(ref_json, user_json, ref_data=ref_data, alignment=alignment, out_dir=out_dir)
+    return score_feedback(
+        sim, out_dir, fps=fps, angle_weight=angle_weight,
+        angle_report_thresh=angle_report_thresh, proc_thresh=proc_thresh, percentile=percentile
+    )
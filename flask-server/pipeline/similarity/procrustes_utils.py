@@ -23,4 +23,36 @@ def compute_procrustes_transform(X: np.ndarray, Y: np.ndarray) -> np.ndarray:
     X0 = X - X.mean(axis=0)
     Y0 = Y - Y.mean(axis=0)
     U, _, Vt = svd(X0.T @ Y0)
-    return U @ Vt
\ No newline at end of file
+    return U @ Vt
+
+def batch_procrustes(X: np.ndarray, Y: np.ndarray) -> dict:
+    """
+    Align every frame of Y to X with one stacked SVD and return everything
+    compute_procrustes_transform + procrustes_frame_dist produce per frame.
+    X, Y: (T, J, 3)
+    Returns dict with
+      'rotations'  (T, 3, 3) optimal rotation aligning Y to X
+      'aligned'    (T, J, 3) centered Y rotated by 'rotations'
+      'scales'     (T,)      scale used for the distance
+      'dists'      (T, J)    per-joint Procrustes distances
+      'mean_dists' (T,)      mean distance per frame
+    The distance step needs the polar factor of (X0ᵀ·Y0)·R, which equals R·R
+    when X0ᵀ·Y0 = R·P (polar decomposition), so the second SVD is not needed.
+    """
+    X0 = X - X.mean(axis=1, keepdims=True)
+    Y0 = Y - Y.mean(axis=1, keepdims=True)
+    U, _, Vt = np.linalg.svd(np.swapaxes(X0, 1, 2) @ Y0)
+    R = U @ Vt
+    aligned = Y0 @ R
+
+    A0 = aligned - aligned.mean(axis=1, keepdims=True)
+    XR = X0 @ (R @ R)
+    scales = (A0 * XR).sum(axis=(1, 2)) / (norm(X0, axis=(1, 2))**2 + 1e-8)
+    dists = norm(A0 - scales[:, None, None] * XR, axis=2)
+    return {
+        'rotations':  R,
+        'aligned':    aligned,
+        'scales':     scales,
+        'dists':      dists,
+        'mean_dists': dists.mean(axis=1),
+    }
@@ -1,68 +1,99 @@
+import os
 import numpy as np
 from .angle_utils import calc_interior_angles_2d, calc_signed_bend_angles_2d, angle_diff
-from .procrustes_utils import procrustes_frame_dist, compute_procrustes_transform
-from .trajectory_utils import extract_root_sequence, dtw_distance
+from .procrustes_utils import batch_procrustes
+from .trajectory_utils import extract_root_sequence, banded_dtw, dtw_frame_mapping
+
+# Temporal alignment between reference and user frames:
+#   "frame": frame t matches frame t (after audio sync)
+#   "dtw"  : banded DTW over pose features, so slightly early/late users are not penalized
+ALIGNMENT = os.environ.get("SCORE_ALIGNMENT", "frame")
+DTW_BAND  = int(os.environ.get("DTW_BAND", 15))
+
+
+def align_user_frames(kp_ref: np.ndarray, kp_user: np.ndarray, band: int = DTW_BAND) -> np.ndarray:
+    """
+    Banded DTW on flattened 2D pose features.
+    Returns for each reference frame the index of the matched user frame: (T_ref,)
+    """
+    feat_ref  = kp_ref[..., :2].reshape(len(kp_ref), -1)
+    feat_user = kp_user[..., :2].reshape(len(kp_user), -1)
+    _, path = banded_dtw(feat_ref, feat_user, band=band)
+    return dtw_frame_mapping(path, len(kp_ref))
+
 
 def compute_frame_similarities(
     kp_ref: np.ndarray,
     kp_user: np.ndarray,
-    angle_weight: float = 0.6
+    angle_weight: float = 0.6,
+    alignment: str = ALIGNMENT,
+    dtw_band: int = DTW_BAND
 ) -> dict:
     """
     Compute per-frame pose/move/final similarity between reference and user keypoints.
-    Returns dict with 'pose', 'move', 'final', 'angle_diffs', 'proc_dists'.
+    alignment: "frame" (same index) or "dtw" (banded DTW, see align_user_frames)
+    Returns dict with 'pose', 'move', 'final', 'angle_diffs', 'proc_dists' (indexed by reference frame)
+    and 'user_index', the user frame scored against each reference frame.
     """
-    T = kp_ref.shape[0]
-    M = calc_interior_angles_2d(kp_ref).shape[1]
-    angle_diffs = np.zeros((T, M))
-    proc_dists  = np.zeros(T)
-    pose_scores = np.zeros(T)
-    move_scores = np.zeros(T)
+    if alignment == "dtw":
+        user_index = align_user_frames(kp_ref, kp_user, band=dtw_band)
+        kp_user = kp_user[user_index]
+    elif alignment == "frame":
+        user_index = np.arange(len(kp_ref))
+    else:
+        raise ValueError(f"Unsupported alignment: {alignment}")
 
     roots_ref  = extract_root_sequence(kp_ref)
     roots_user = extract_root_sequence(kp_user)
     max_root   = np.linalg.norm(roots_ref - roots_user, axis=1).max() + 1e-6
 
-    for t in range(T):
-        # Procrustes align
-        R = compute_procrustes_transform(kp_ref[t], kp_user[t])
-        aligned = (kp_user[t] - kp_user[t].mean(axis=0)).dot(R)
-
-        # Angle diffs
-        ang_ref = calc_interior_angles_2d(kp_ref[t][None])[0]
-        ang_usr = calc_interior_angles_2d(aligned[None])[0]
-        bend_ref = calc_signed_bend_angles_2d(kp_ref[t][None])[0]
-        bend_usr = calc_signed_bend_angles_2d(aligned[None])[0]
-                # Angle diffs: use interior for most, bend for elbows/knees
-        diff = np.abs(ang_ref - ang_usr)
-        bend_diff = np.abs(bend_usr - bend_ref)
-        # bend joints: 0,1=elbows; 4,5=knees
-        bend_idxs = [0, 1, 4, 5]
-        for i in bend_idxs:
-            diff[i] = bend_diff[i]
-        angle_diffs[t] = diff
-
-        # Procrustes distance
-        _, pd = procrustes_frame_dist(kp_ref[t], aligned)
-        proc_dists[t] = pd
-
-        # Scores
-        angle_sim = 1.0 - diff.mean() / np.pi
-        proc_sim  = 1.0 - pd
-        pose_scores[t] = angle_weight * angle_sim + (1 - angle_weight) * proc_sim
-        move_scores[t] = 1.0 - np.linalg.norm(roots_ref[t] - roots_user[t]) / max_root
+    # Procrustes align + distance for all frames (single stacked SVD)
+    proc       = batch_procrustes(kp_ref, kp_user)
+    aligned    = proc['aligned']
+    proc_dists = proc['mean_dists'].astype(np.float64)
 
-    final_scores = 0.5 * pose_scores + 0.5 * move_scores
+    # Angle diffs for all frames at once: use interior for most, bend for elbows/knees
+    ang_ref  = calc_interior_angles_2d(kp_ref)
+    ang_usr  = calc_interior_angles_2d(aligned)
+    bend_ref = calc_signed_bend_angles_2d(kp_ref)
+    bend_usr = calc_signed_bend_angles_2d(aligned)
+    diff = np.abs(ang_ref - ang_usr)
+    # bend joints: 0,1=elbows; 4,5=knees
+    bend_idxs = [0, 1, 4, 5]
+    diff[:, bend_idxs] = np.abs(bend_usr - bend_ref)[:, bend_idxs]
+    angle_diffs = diff.astype(np.float64)
+
+    # Scores
+    move_scores = (1.0 - np.linalg.norm(roots_ref - roots_user, axis=1) / max_root).astype(np.float64)
+    pose_scores, final_scores = combine_scores(angle_diffs, proc_dists, move_scores, angle_weight)
 
     return {
         "pose": pose_scores,
         "move": move_scores,
         "final": final_scores,
         "angle_diffs": angle_diffs,
-        "proc_dists": proc_dists
+        "proc_dists": proc_dists,
+        "user_index": user_index
     }
 
 
+def combine_scores(
+    angle_diffs: np.ndarray,
+    proc_dists: np.ndarray,
+    move_scores: np.ndarray,
+    angle_weight: float = 0.6
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Combine per-frame angle diffs, Procrustes distances and move scores.
+    Returns (pose_scores, final_scores).
+    """
+    angle_sim   = 1.0 - angle_diffs.mean(axis=1) / np.pi
+    proc_sim    = 1.0 - proc_dists
+    pose_scores = angle_weight * angle_sim + (1 - angle_weight) * proc_sim
+    final_scores = 0.5 * pose_scores + 0.5 * move_scores
+    return pose_scores, final_scores
+
+
 def aggregate_per_second(frame_scores: np.ndarray, fps: int) -> np.ndarray:
     """
     Aggregate frame-level scores into per-second averages.
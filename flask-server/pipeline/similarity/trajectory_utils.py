@@ -32,3 +32,89 @@ def dtw_distance(ts1: np.ndarray, ts2: np.ndarray) -> tuple[float, tuple[list[in
         steps = [(dp[i-1,j-1], i-1, j-1), (dp[i-1,j], i-1, j), (dp[i,j-1], i, j-1)]
         _, i, j = min(steps, key=lambda x: x[0])
     return dp[T1, T2], (path1[::-1], path2[::-1])
+
+
+def _shift(row: np.ndarray, s: int) -> np.ndarray:
+    """
+    out[k] = row[k + s] (inf where out of range)
+    """
+    out = np.full_like(row, np.inf)
+    W = len(row)
+    if s >= 0:
+        if s < W:
+            out[:W - s] = row[s:]
+    elif -s < W:
+        out[-s:] = row[:W + s]
+    return out
+
+
+def banded_dtw(ts1: np.ndarray, ts2: np.ndarray, band: int = 15) -> tuple[float, tuple[list[int], list[int]]]:
+    """
+    DTW restricted to a Sakoe-Chiba band around the (length-scaled) diagonal.
+    ts1, ts2: (T1, D), (T2, D)
+    band: half-width of the band in frames
+    Costs are computed per row with vectorized distances; the in-row horizontal
+    recurrence is solved as a prefix-min scan, so the only Python loop is over rows.
+    Memory: two band-wide cost rows plus a (T1, band) int8 back-pointer table.
+    Returns: (distance, (path1, path2)) like dtw_distance
+    """
+    T1, T2 = ts1.shape[0], ts2.shape[0]
+    if T1 == 0 or T2 == 0:
+        return np.inf, ([], [])
+    # 길이 비율보다 좁은 밴드로는 끝점까지 경로가 이어지지 않음
+    band = max(int(band), int(np.ceil(max(T1, T2) / min(T1, T2))))
+    W = min(2 * band + 1, T2)
+    slope = (T2 - 1) / (T1 - 1) if T1 > 1 else 0.0
+    lo = np.clip(np.round(np.arange(T1) * slope).astype(np.int64) - band, 0, T2 - W)
+
+    ptr = np.zeros((T1, W), dtype=np.int8)   # 0=diag, 1=up, 2=left
+    prev = None
+    for i in range(T1):
+        cols = slice(lo[i], lo[i] + W)
+        cost = np.linalg.norm(ts2[cols] - ts1[i], axis=1)
+        if prev is None:
+            a = np.full(W, np.inf)
+            a[0] = cost[0] if lo[i] == 0 else np.inf
+            choice = np.zeros(W, dtype=np.int8)
+        else:
+            d = int(lo[i] - lo[i - 1])
+            up, diag = _shift(prev, d), _shift(prev, d - 1)
+            choice = (up < diag).astype(np.int8)
+            a = cost + np.minimum(diag, up)
+        # 가로 이동: dp[j] = min(a[j], dp[j-1] + cost[j]) → 누적합 + prefix-min
+        S = np.cumsum(cost)
+        with np.errstate(invalid='ignore'):
+            cur = S + np.minimum.accumulate(a - S)
+        # 누적합 반올림 오차로 선택이 뒤집히지 않도록 왼쪽 후보와 직접 비교해서 확정
+        left = np.r_[np.inf, cur[:-1]] + cost
+        left = np.where(np.isnan(left), np.inf, left)
+        cur = np.minimum(a, left)
+        choice[left < a] = 2
+        ptr[i] = choice
+        prev = cur
+
+    # 역추적
+    i, j = T1 - 1, T2 - 1
+    path1, path2 = [i], [j]
+    while i > 0 or j > 0:
+        step = ptr[i, j - lo[i]]
+        if i == 0 or step == 2:
+            j -= 1
+        elif step == 1 or j == 0:
+            i -= 1
+        else:
+            i, j = i - 1, j - 1
+        path1.append(i)
+        path2.append(j)
+    return float(prev[T2 - 1 - lo[T1 - 1]]), (path1[::-1], path2[::-1])
+
+
+def dtw_frame_mapping(path: tuple[list[int], list[int]], T1: int) -> np.ndarray:
+    """
+    For each frame of the first sequence, the first matched frame of the second sequence.
+    """
+    p1, p2 = np.asarray(path[0]), np.asarray(path[1])
+    first = np.r_[True, p1[1:] != p1[:-1]]
+    mapping = np.zeros(T1, dtype=np.int64)
+    mapping[p1[first]] = p2[first]
+    return mapping
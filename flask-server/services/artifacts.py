@@ -0,0 +1,107 @@
+# flask-server/services/artifacts.py
+# /data/<path> 결과물 서빙.
+#   - 파일 크기/수정 시각/inode 로 만든 strong ETag (If-None-Match → 304, 요청 중에 파일을 해시하지 않음)
+#   - 끝난 작업의 결과물은 내용이 바뀌지 않으므로 immutable 캐시
+#   - Range 요청 (영상 탐색)
+#   - 미리 압축해 둔 .br / .gz 가 있으면 Accept-Encoding 에 맞춰 그대로 전송
+
+import os
+import json
+import gzip
+import shutil
+import hashlib
+import mimetypes
+from flask import request, send_file, abort
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATUS_FILE = 'job.json'
+
+
+def precompress(path: str):
+    """
+    JSON 결과물을 만든 직후 호출해서 path.gz (와 brotli 가 있으면 path.br) 를 같이 써 둡니다.
+    """
+    with open(path, 'rb') as src, open(path + '.gz.tmp', 'wb') as raw:
+        # mtime=0 → 같은 내용이면 같은 바이트
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+    os.replace(path + '.gz.tmp', path + '.gz')
+    if brotli is not None:
+        with open(path, 'rb') as f:
+            data = brotli.compress(f.read(), quality=11)
+        with open(path + '.br.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.br.tmp', path + '.br')
+
+
+def strong_etag(path: str) -> str:
+    """
+    결과물을 다시 쓰면(덮어쓰기든 os.replace 든) mtime 이나 inode 가 바뀌므로 태그도 바뀝니다.
+    수백 MB 영상을 요청 스레드에서 해시하지 않도록 stat 정보만으로 태그를 만듭니다.
+    """
+    st = os.stat(path)
+    key = f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _is_final(base_dir: str, filename: str) -> bool:
+    """
+    작업이 끝났으면 그 폴더의 결과물은 더 이상 바뀌지 않음 (job.json 자체는 제외)
+    """
+    parts = filename.replace('\\', '/').split('/')
+    if len(parts) < 2 or parts[-1] in (STATUS_FILE, STATUS_FILE + '.tmp'):
+        return False
+    try:
+        with open(os.path.join(base_dir, parts[0], STATUS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get('status') == 'done'
+    except (OSError, ValueError):
+        return False
+
+
+def _pick_encoding(path: str):
+    accepted = request.accept_encodings
+    for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[encoding] and os.path.isfile(path + ext):
+            return encoding, path + ext
+    return None, path
+
+
+def serve_artifact(base_dir: str, filename: str):
+    path = safe_join(base_dir, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    encoding, send_path = _pick_encoding(path)
+    etag = strong_etag(send_path)
+    if encoding:
+        etag = f"{etag}-{encoding}"
+
+    # conditional=True → If-None-Match / If-Range / Range 를 werkzeug 가 처리 (206, 304)
+    response = send_file(
+        send_path,
+        mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+        conditional=True,
+        etag=etag,
+        max_age=0
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if encoding or os.path.isfile(path + '.gz') or os.path.isfile(path + '.br'):
+        response.vary.add('Accept-Encoding')
+
+    if _is_final(base_dir, filename):
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    else:
+        # 진행 중인 작업은 매번 ETag 로 재검증
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    return response
@@ -0,0 +1,107 @@
+# flask-server/services/checkpoints.py
+# compare 파이프라인 단계별 완료 기록 (work/stages/<stage>.json).
+# 단계가 끝나면 입력 지문(fingerprint)과 출력 파일(크기, 작은 파일은 sha256)을 남기고,
+# 다시 실행할 때 지문이 같고 출력이 그대로 있으면(크기, 기록된 sha256 일치) 그 단계를 건너뜁니다.
+# 다음 단계는 이전 단계 기록의 digest 를 입력으로 쓰므로, 앞 단계 결과가 바뀌면 뒤 단계도 다시 실행됩니다.
+
+import os
+import json
+import time
+import hashlib
+
+MANIFEST_DIR = 'stages'
+INPUTS_FILE  = 'inputs.json'
+# 이보다 큰 출력(영상)은 해시하지 않고 크기만 기록
+HASH_LIMIT = 64 * 1024**2
+
+
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(path: str, data: dict):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Checkpoints:
+    """
+    한 작업 폴더의 단계 기록.
+      fingerprint(stage, **inputs) → 입력 지문
+      valid(stage, fp)             → 지문이 같고 출력이 모두 그대로면 기록(dict), 아니면 None
+      complete(stage, fp, outputs, data) → 기록을 남기고 반환 (기록의 'digest' 를 다음 단계 입력으로 사용)
+    """
+
+    def __init__(self, work_dir: str):
+        self.work_dir = work_dir
+        self.root = os.path.join(work_dir, MANIFEST_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.root, f"{stage}.json")
+
+    # ---- 작업 입력 (resume 때 다시 씀) ----
+
+    def save_inputs(self, **inputs):
+        _write_json(os.path.join(self.root, INPUTS_FILE), inputs)
+
+    def load_inputs(self) -> dict:
+        return _read_json(os.path.join(self.root, INPUTS_FILE))
+
+    # ---- 단계 기록 ----
+
+    def fingerprint(self, stage: str, **inputs) -> str:
+        payload = json.dumps({'stage': stage, 'inputs': inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def valid(self, stage: str, fingerprint: str) -> dict:
+        manifest = _read_json(self._path(stage))
+        if manifest is None or manifest.get('fingerprint') != fingerprint:
+            return None
+        for out in manifest['outputs'].values():
+            path = os.path.join(self.work_dir, out['path'])
+            if not os.path.isfile(path) or os.path.getsize(path) != out['size']:
+                return None
+            # 크기가 같아도 내용이 깨졌을 수 있음 (키포인트/유사도 같은 작은 출력은 해시로 확인)
+            if out.get('sha256') and _file_sha256(path) != out['sha256']:
+                return None
+        return manifest
+
+    def complete(self, stage: str, fingerprint: str, outputs: list, data: dict = None) -> dict:
+        """
+        outputs: 이 단계가 만든(또는 다음 단계가 읽는) 파일 경로 목록
+        data: 건너뛸 때 다시 필요한 값 (싱크 정보, 결과 파일 이름 등)
+        """
+        files = {}
+        for path in outputs:
+            rel = os.path.relpath(path, self.work_dir).replace(os.sep, '/')
+            size = os.path.getsize(path)
+            files[rel] = {'path': rel, 'size': size,
+                          'sha256': _file_sha256(path) if size <= HASH_LIMIT else None}
+        digest = hashlib.sha256(
+            (fingerprint + json.dumps(files, sort_keys=True)).encode()
+        ).hexdigest()
+        manifest = {'stage': stage, 'fingerprint': fingerprint, 'digest': digest,
+                    'outputs': files, 'data': data or {}, 'finished': time.time()}
+        _write_json(self._path(stage), manifest)
+        return manifest
+
+    def invalidate(self, stage: str):
+        try:
+            os.remove(self._path(stage))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,278 @@
+# flask-server/services/extract_pool.py
+# 키포인트 추출(과 구간 렌더링)을 별도 프로세스에서 돌리기 위한 공용 프로세스 풀.
+# 모든 compare 작업이 이 풀 하나를 같이 쓰기 때문에 동시 작업이 많아도
+# 추출/렌더링에 쓰는 코어 수는 CPU 예산(cpu_budget)을 넘지 않습니다.
+
+import os
+import time
+import shutil
+import threading
+import multiprocessing
+from queue import Empty
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# 워커 프로세스 안에서만 쓰는 값: 모델 상태를 부모에게 보내는 큐와 마지막으로 보낸 상태
+_status_queue = None
+_last_status  = None
+
+
+def _report_status():
+    """
+    워커의 모델 로드/워밍업 상태가 바뀌었으면 부모 프로세스로 보냄 (GET /compare/models)
+    """
+    global _last_status
+    if _status_queue is None:
+        return
+    from pipeline.extract_keypoints.model_registry import registry_status
+    status = registry_status()
+    if status != _last_status:
+        _last_status = status
+        try:
+            _status_queue.put_nowait(status)
+        except Exception:
+            pass
+
+
+def _init_worker(threads: int, status_queue=None):
+    global _status_queue
+    _status_queue = status_queue
+    # 프로세스마다 내부 스레드 수를 나눠 가진 뒤 모델을 미리 올려 둠.
+    # OMP/MKL/OpenBLAS 는 import 시점에 환경 변수를 읽으므로 풀을 만들 때 부모에서 설정해 두고
+    # (spawn 된 워커는 app.py 를 다시 import 하면서 numpy/cv2 를 먼저 올림), 여기서는 런타임 설정만 맞춤
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+    import cv2
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from pipeline.extract_keypoints.model_registry import warm_up
+    warm_up()
+    _report_status()
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.time()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        # track 모드의 video Pose 처럼 작업 중에 처음 올라가는 모델도 있음
+        _report_status()
+    return result, time.time() - start
+
+
+def abandon(task):
+    """
+    submit()/submit_extract() 로 넘긴 작업을 버립니다 (호출한 쪽이 먼저 실패했을 때).
+    아직 시작하지 않은 것은 취소하고, 이미 돌고 있는 것은 끝날 때까지 기다립니다.
+    """
+    futures = task.futures if isinstance(task, SegmentedExtract) else [task]
+    for f in futures:
+        f.cancel()
+    wait(futures)
+
+
+class SegmentedExtract:
+    """
+    구간별로 나눠 제출한 추출 작업 묶음. result() 를 부른 스레드에서 모든 구간을 기다린 뒤
+    이어 붙여 저장합니다 (풀의 관리 스레드에서 큰 파일을 쓰면 다른 작업의 결과 전달이 막힘).
+    한 구간이라도 실패하면 아직 시작하지 않은 나머지 구간은 취소하고 돌고 있는 구간은 기다립니다.
+    """
+
+    def __init__(self, futures: list, output_dir: str, save):
+        self.futures    = futures
+        self.output_dir = output_dir
+        self._save      = save
+        self._started   = time.time()
+
+    def result(self):
+        """
+        Returns: ((csv, keypoints, frames), 걸린 시간) — submit() 의 Future 와 같은 형태
+        """
+        done, _ = wait(self.futures, return_when=FIRST_EXCEPTION)
+        failed = [f for f in done if not f.cancelled() and f.exception() is not None]
+        if failed:
+            abandon(self)
+            raise failed[0].exception()
+        parts = [f.result()[0] for f in self.futures]
+        return self._save(self.output_dir, parts), time.time() - self._started
+
+
+class ExtractPool:
+    """
+    processes 개의 워커 프로세스, 프로세스당 cpu_budget // processes 개의 스레드.
+    submit() 은 (결과, 워커 안에서 걸린 시간) 을 돌려주는 Future 를 반환합니다.
+    segment_frames 가 0 보다 크면 submit_extract() 는 긴 영상을 그 길이의 구간으로 나눠
+    여러 워커에서 동시에 추출한 뒤 순서대로 이어 붙입니다.
+    render_chunk_frames 가 0 보다 크면 render_feedback() 도 같은 방식으로 구간별 인코딩 후 concat 합니다.
+    """
+
+    def __init__(self, processes: int, cpu_budget: int,
+                 segment_frames: int = 0, segment_warmup: int = 30, render_chunk_frames: int = 0):
+        self.processes  = max(1, processes)
+        self.cpu_budget = max(self.processes, cpu_budget)
+        self.segment_frames = segment_frames
+        self.segment_warmup = segment_warmup
+        self.render_chunk_frames = render_chunk_frames
+        threads = max(1, self.cpu_budget // self.processes)
+        # spawn 된 워커는 생성 시점의 os.environ 을 물려받음 (풀 워커는 첫 submit 때 뜨므로 되돌리지 않음)
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(threads)
+        ctx = multiprocessing.get_context("spawn")
+        self._status_queue  = ctx.Queue()
+        self._worker_status = {}
+        self._status_lock   = threading.Lock()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(threads, self._status_queue)
+        )
+
+    def prestart(self):
+        """
+        워커 프로세스를 미리 전부 띄워서 모델 로드·워밍업이 첫 작업 전에 끝나도록 합니다.
+        """
+        for _ in range(self.processes):
+            self._pool.submit(os.getpid)
+
+    def submit(self, fn, *args, **kwargs):
+        return self._pool.submit(_timed, fn, *args, **kwargs)
+
+    def model_status(self) -> dict:
+        """
+        워커 프로세스들이 보내 온 모델 로드 시간 / 워밍업 상태 ("pid/스레드" → 모델별 상태)
+        """
+        with self._status_lock:
+            while True:
+                try:
+                    self._worker_status.update(self._status_queue.get_nowait())
+                except Empty:
+                    break
+            return {name: dict(models) for name, models in self._worker_status.items()}
+
+    def run(self, fn, *args, **kwargs):
+        """
+        submit 후 결과만 기다려서 반환 (블로킹)
+        """
+        result, _ = self.submit(fn, *args, **kwargs).result()
+        return result
+
+    # ---- 키포인트 추출 (구간 병렬) ----
+
+    def submit_extract(self, video_path: str, output_dir: str,
+                       start_frame: int = 0, num_frames: int = None):
+        """
+        result() 가 ((csv, keypoints, frames), 걸린 시간) 을 돌려주는 Future.
+        영상이 segment_frames 보다 길면 구간별로 나눠 제출하고 SegmentedExtract 를 반환
+        (result() 를 부른 스레드에서 모든 구간을 기다린 뒤 이어 붙여 저장)
+        """
+        # 워커가 스레드 수를 정하기 전에 모델 라이브러리를 import 하지 않도록 여기서 import
+        from pipeline.extract_keypoints.yolo_and_mediapipe_pose import (
+            SegmentCapture, extract_keypoints, extract_segment, plan_segments, save_segments,
+            EXTRACT_MODE, SAVE_FRAMES
+        )
+        cap = SegmentCapture(video_path, start_frame, num_frames)
+        total = cap.total
+        cap.release()
+        if self.segment_frames <= 0 or total <= self.segment_frames:
+            return self.submit(extract_keypoints, video_path, output_dir,
+                               start_frame=start_frame, num_frames=num_frames)
+
+        # detect 모드는 프레임 간 상태가 없으므로 워밍업 구간이 필요 없음
+        warmup = self.segment_warmup if EXTRACT_MODE == "track" else 0
+        segments = plan_segments(total, self.segment_frames, warmup)
+        os.makedirs(output_dir, exist_ok=True)
+        frames_dir = os.path.join(output_dir, "frames") if SAVE_FRAMES else None
+        if frames_dir:
+            os.makedirs(frames_dir, exist_ok=True)
+
+        futures = [
+            self.submit(extract_segment, video_path, start_frame + seg_start, seg_len,
+                        warmup=warm, frame_base=seg_start, frames_dir=frames_dir)
+            for seg_start, seg_len, warm in segments
+        ]
+        return SegmentedExtract(futures, output_dir, save_segments)
+
+    def run_extract(self, video_path: str, output_dir: str,
+                    start_frame: int = 0, num_frames: int = None):
+        """
+        submit_extract 후 결과만 기다려서 반환 (블로킹, extract_keypoints 대용)
+        """
+        result, _ = self.submit_extract(video_path, output_dir, start_frame, num_frames).result()
+        return result
+
+    # ---- 피드백 영상 렌더링 (구간 병렬) ----
+
+    def render_feedback(self, feedback_json: str, teacher_video: str, student_video: str,
+                        teacher_kp: tuple, student_kp: tuple, out_video_path: str, fps: float,
+                        teacher_start: int = 0, student_start: int = 0, num_frames: int = None,
+                        audio: tuple = None, student_index=None) -> str:
+        """
+        render_feedback_stream 과 같은 결과를 만듭니다 (블로킹).
+        타임라인을 render_chunk_frames 길이로 나눠 워커마다 한 구간씩 합성·인코딩하고,
+        concat demuxer 로 재인코딩 없이 이어 붙이면서 오디오도 같은 단계에서 붙입니다.
+        student_index: DTW 정렬일 때 프레임별로 보여줄 연습생 프레임 (render_feedback_stream 참고)
+        """
+        import numpy as np
+        from pipeline.extract_keypoints.yolo_and_mediapipe_pose import SegmentCapture
+        from pipeline.extract_keypoints.img_to_video_feedback import (
+            render_feedback_stream, concat_videos
+        )
+        sources = [(teacher_video, teacher_start)]
+        if student_index is None:
+            sources.append((student_video, student_start))
+        else:
+            student_index = np.maximum.accumulate(np.asarray(student_index, dtype=np.int64))
+        total = []
+        for video, start in sources:
+            cap = SegmentCapture(video, start, num_frames)
+            total.append(cap.total)
+            cap.release()
+        if student_index is not None:
+            total.append(len(student_index))
+        total = min(total)
+
+        kwargs = dict(fps=fps, teacher_start=teacher_start, student_start=student_start)
+        if self.render_chunk_frames <= 0 or total <= self.render_chunk_frames:
+            return render_feedback_stream(feedback_json, teacher_video, student_video,
+                                          teacher_kp, student_kp, out_video_path,
+                                          num_frames=total, audio=audio,
+                                          student_index=student_index, **kwargs)
+
+        chunk_dir = os.path.splitext(out_video_path)[0] + "_chunks"
+        os.makedirs(chunk_dir, exist_ok=True)
+        try:
+            futures, parts = [], []
+            for a in range(0, total, self.render_chunk_frames):
+                b = min(total, a + self.render_chunk_frames)
+                part = os.path.join(chunk_dir, f"chunk_{a:08d}.mp4")
+                parts.append(part)
+                # 연습생 쪽은 이 구간이 보여줄 프레임 범위 [lo, hi)
+                if student_index is None:
+                    lo, hi, index = a, b, None
+                else:
+                    lo, hi = int(student_index[a]), int(student_index[b - 1]) + 1
+                    index = student_index[a:b] - lo
+                # 워커로 보내는 키포인트는 이 구간만 (mmap 이면 여기서 필요한 부분만 읽힘)
+                futures.append(self.submit(
+                    render_feedback_stream, feedback_json, teacher_video, student_video,
+                    tuple(np.ascontiguousarray(x[a:b]) for x in teacher_kp),
+                    tuple(np.ascontiguousarray(x[lo:hi]) for x in student_kp),
+                    part,
+                    fps=fps, teacher_start=teacher_start + a, student_start=student_start + lo,
+                    num_frames=b - a, frame_base=a, faststart=False, student_index=index
+                ))
+            for fut in futures:
+                fut.result()
+            return concat_videos(parts, out_video_path, audio=audio)
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
@@ -0,0 +1,76 @@
+# flask-server/services/job_index.py
+# 업로드 내용 해시 + 파이프라인 설정으로 만든 키 → job_id 색인.
+# 같은 댄서/연습생 영상을 다시 올리면 끝난 결과를 바로 돌려주고, 진행 중이면 그 작업에 합류합니다.
+
+import os
+import json
+import hashlib
+import threading
+
+# 결과에 영향을 주는 파이프라인이 바뀌면 올려서 예전 결과를 재사용하지 않게 함
+JOB_KEY_VERSION = 1
+
+
+def save_with_hash(file_storage, path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    업로드 스트림을 chunk 단위로 디스크에 쓰면서 동시에 sha256 을 계산
+    """
+    h = hashlib.sha256()
+    with open(path, 'wb') as f:
+        for chunk in iter(lambda: file_storage.stream.read(chunk_size), b''):
+            h.update(chunk)
+            f.write(chunk)
+    return h.hexdigest()
+
+
+def job_key(dancer_hash: str, trainee_hash: str, settings: dict) -> str:
+    h = hashlib.sha256(f"{JOB_KEY_VERSION}:{dancer_hash}:{trainee_hash}".encode())
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class JobIndex:
+    """
+    root/<key> 파일에 job_id 를 기록합니다 (서버 재시작 뒤에도 유지).
+    lookup → register 사이에 같은 키가 끼어들지 않도록 lock 으로 감싸서 사용
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def lookup(self, key: str) -> str:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def register(self, key: str, job_id: str):
+        path = self._path(key)
+        tmp  = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(job_id)
+        os.replace(tmp, path)
+
+    def entries(self) -> dict:
+        """
+        key → job_id 전체 (정리할 때 사용)
+        """
+        result = {}
+        for key in os.listdir(self.root):
+            if not key.endswith('.tmp'):
+                job_id = self.lookup(key)
+                if job_id:
+                    result[key] = job_id
+        return result
+
+    def forget(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,191 @@
+# flask-server/services/job_queue.py
+# /compare 작업을 요청 스레드 밖의 워커 풀에서 돌리고, 진행 상황을 조회할 수 있게 합니다.
+
+import os
+import json
+import time
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# compare 파이프라인 단계 (진행률 계산용)
+STAGES = ['sync', 'extract_dancer', 'extract_trainee', 'feedback', 'rendering']
+
+STATUS_FILE = 'job.json'
+
+
+class Job:
+    """
+    하나의 비교 작업 상태.
+    stage_timer(name) 컨텍스트로 단계를 감싸면 진행 단계와 소요 시간(durations)이 기록되고
+    작업 폴더의 job.json 에도 그대로 저장됩니다.
+    """
+
+    def __init__(self, job_id: str, work_dir: str, stages=STAGES):
+        self.job_id    = job_id
+        self.work_dir  = work_dir
+        self.stages    = list(stages)
+        self.status    = 'queued'
+        self.stage     = None
+        self.completed = []
+        self.skipped   = []
+        self.durations = {}
+        self.result    = None
+        self.error     = None
+        self.created   = time.time()
+        self._lock     = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save()
+
+    @contextmanager
+    def stage_timer(self, name: str):
+        with self._lock:
+            self.stage = name
+        self._save()
+        start = time.time()
+        yield
+        with self._lock:
+            self.durations[name] = time.time() - start
+            self.completed.append(name)
+        self._save()
+
+    def record(self, name: str, seconds: float):
+        """
+        다른 스레드/프로세스에서 측정한 단계 소요 시간을 기록
+        """
+        with self._lock:
+            self.durations[name] = seconds
+            self.completed.append(name)
+        self._save()
+
+    def skip(self, name: str):
+        """
+        이전 실행의 결과를 그대로 쓰는 단계 (resume)
+        """
+        with self._lock:
+            self.skipped.append(name)
+            self.completed.append(name)
+        self._save()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            total = len(self.stages)
+            return {
+                'job_id':           self.job_id,
+                'status':           self.status,
+                'stage':            self.stage,
+                'completed_stages': list(self.completed),
+                'skipped_stages':   list(self.skipped),
+                'progress':         len(self.completed) / total if total else 1.0,
+                'durations':        dict(self.durations),
+                'result':           self.result,
+                'error':            self.error,
+            }
+
+    def _set(self, **fields):
+        with self._lock:
+            for k, v in fields.items():
+                setattr(self, k, v)
+        self._save()
+
+    def _save(self):
+        # 서버 재시작 뒤에도 GET /compare/<job_id> 가 응답할 수 있도록 디스크에 남김
+        path = os.path.join(self.work_dir, STATUS_FILE)
+        tmp  = path + '.tmp'
+        with self._save_lock:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp, path)
+
+
+class JobQueue:
+    """
+    동시 실행 수가 제한된 로컬 워커 풀.
+    submit() 은 바로 Job 을 돌려주고, 실제 작업은 풀의 스레드에서 fn(job, *args) 로 실행됩니다.
+    """
+
+    def __init__(self, max_workers: int = 2, initializer=None):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='compare-worker',
+            initializer=initializer
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def prestart(self, timeout: float = 600):
+        """
+        워커 스레드를 미리 전부 띄워서 initializer(모델 워밍업)가 첫 작업 전에 끝나도록 합니다.
+        """
+        barrier = threading.Barrier(self.max_workers)
+
+        def _wait():
+            try:
+                barrier.wait(timeout)
+            except threading.BrokenBarrierError:
+                pass
+
+        for _ in range(self.max_workers):
+            self._pool.submit(_wait)
+
+    def submit(self, job_id: str, work_dir: str, fn, *args, stages=STAGES, **kwargs) -> Job:
+        job = Job(job_id, work_dir, stages=stages)
+        with self._lock:
+            self._jobs[job_id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str, base_dir: str = None) -> dict:
+        """
+        메모리에 있으면 현재 상태를, 없으면 base_dir/<job_id>/job.json 을 읽어 반환.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if base_dir is None:
+            return None
+        path = os.path.join(base_dir, job_id, STATUS_FILE)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def forget(self, job_id: str, work_dir: str = None):
+        """
+        작업 폴더가 지워졌을 때 메모리의 상태도 지움.
+        work_dir 를 주면 그 폴더 안에서 돌던 작업(재채점 렌더링 등)도 같이 지움
+        """
+        prefix = os.path.abspath(work_dir) + os.sep if work_dir else None
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            if prefix:
+                for jid in [j for j, job in self._jobs.items()
+                            if os.path.abspath(job.work_dir).startswith(prefix)]:
+                    del self._jobs[jid]
+
+    def active_dirs(self) -> list:
+        """
+        대기 중이거나 실행 중인 작업의 작업 폴더 (정리 대상에서 제외)
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.work_dir for job in jobs if job.status in ('queued', 'running')]
+
+    def _run(self, job: Job, fn, args, kwargs):
+        job._set(status='running')
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            job._set(status='failed', error=f"{job.stage or 'job'} 실패: {e}")
+        else:
+            job._set(status='done', stage=None, result=result)
+        # 끝난 작업은 job.json 으로 조회되므로 메모리에서 내림
+        # (job.json 이 <base_dir>/<job_id>/ 에 있지 않은 재채점 렌더링은 메모리에 남김)
+        if os.path.basename(os.path.normpath(job.work_dir)) == job.job_id:
+            with self._lock:
+                if self._jobs.get(job.job_id) is job:
+                    del self._jobs[job.job_id]
@@ -0,0 +1,184 @@
+# flask-server/services/reference_cache.py
+# 레퍼런스(댄서) 영상의 키포인트/전처리 결과/오디오를 영상 내용 해시로 캐시합니다.
+# 같은 안무 영상이 여러 연습생과 비교될 때 레퍼런스 쪽 작업을 다시 하지 않기 위함입니다.
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+
+from pipeline.extract_keypoints.sound_sync              import load_audio
+from pipeline.extract_keypoints.yolo_and_mediapipe_pose import (
+    extract_keypoints, EXTRACT_MODE, REDETECT_EVERY, MIN_VISIBILITY,
+    FRAME_STRIDE, ADAPTIVE_STRIDE, MOTION_THRESH
+)
+from pipeline.extract_keypoints.model_registry          import YOLO_WEIGHTS, POSE_OPTIONS
+from pipeline.similarity.main                          import load_keypoints
+from pipeline.similarity.data_utils                    import load_keypoint_store
+
+# 추출 설정이 바뀌면 캐시 키도 바뀌어야 함
+CACHE_VERSION = 3
+STAMP_FILE    = '.last_used'
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extraction_settings(sr: int = 22050) -> dict:
+    return {
+        'version': CACHE_VERSION,
+        'yolo':    YOLO_WEIGHTS,
+        'pose':    POSE_OPTIONS,
+        'mode':    EXTRACT_MODE,
+        'track':   [REDETECT_EVERY, MIN_VISIBILITY] if EXTRACT_MODE == 'track' else None,
+        'sr':      sr,
+        'stride':  ([FRAME_STRIDE, ADAPTIVE_STRIDE, MOTION_THRESH if ADAPTIVE_STRIDE else None]
+                    if FRAME_STRIDE > 1 or ADAPTIVE_STRIDE else None),
+    }
+
+
+class ReferenceCache:
+    """
+    root/<key>/ 아래에
+      audio.npy        : 싱크용 모노 오디오
+      keypoints.npy    : 전체 길이 원본 영상의 키포인트 (extract_keypoints 결과)
+      features.npy     : 전처리된 kp (interpolate → smooth → normalize)
+    를 저장하고, 전체 크기가 max_bytes 를 넘으면 가장 오래 안 쓴 항목부터 지웁니다.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root      = root
+        self.max_bytes = max_bytes
+        self._locks    = {}
+        self._in_use   = {}
+        self._lock     = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key_for(self, video_path: str, settings: dict) -> str:
+        return self.key_for_hash(file_sha256(video_path), settings)
+
+    def key_for_hash(self, digest: str, settings: dict) -> str:
+        """
+        업로드하면서 이미 계산한 영상 sha256 으로 키를 만듦 (파일을 다시 읽지 않음)
+        """
+        h = hashlib.sha256(digest.encode())
+        h.update(json.dumps(settings, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def key_lock(self, key: str) -> threading.Lock:
+        # 같은 레퍼런스를 동시에 두 번 추출하지 않도록 키별 잠금
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def acquire(self, key: str) -> str:
+        """
+        작업이 끝날 때까지 해당 항목이 제거되지 않도록 표시하고 LRU 시각을 갱신
+        """
+        with self._lock:
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        d = self.entry_dir(key)
+        os.makedirs(d, exist_ok=True)
+        stamp = os.path.join(d, STAMP_FILE)
+        with open(stamp, 'a'):
+            pass
+        os.utime(stamp, None)
+        return d
+
+    def release(self, key: str):
+        with self._lock:
+            self._in_use[key] -= 1
+            if self._in_use[key] <= 0:
+                del self._in_use[key]
+        self.enforce_budget()
+
+    # ---- 항목별 조회/생성 ----
+
+    def get_audio(self, key: str, video_path: str, sr: int = 22050) -> np.ndarray:
+        path = os.path.join(self.entry_dir(key), 'audio.npy')
+        with self.key_lock(key):
+            if not os.path.isfile(path):
+                y = load_audio(video_path, sr)
+                np.save(path, y)
+                return y
+        return np.load(path, mmap_mode='r')
+
+    def get_keypoints(self, key: str, video_path: str, extractor=extract_keypoints) -> dict:
+        """
+        extractor: 캐시 미스 때 쓸 추출 함수 (extract_keypoints 와 같은 시그니처)
+        Returns: {'path': keypoints.npy 경로,
+                  'kp_raw': (T, J, 3), 'vis': (T, J), 'kp': 전처리된 (T, J, 3)}
+        """
+        d = self.entry_dir(key)
+        kp_path = os.path.join(d, 'keypoints.npy')
+        feats   = os.path.join(d, 'features.npy')
+        with self.key_lock(key):
+            if not os.path.isfile(feats):
+                _, kp_path, _ = extractor(video_path, d)
+                _, _, kp = load_keypoints(kp_path)
+                tmp = os.path.join(d, 'features.tmp.npy')
+                np.save(tmp, kp)
+                os.replace(tmp, feats)
+        store = load_keypoint_store(kp_path)
+        return {
+            'path':   kp_path,
+            'kp_raw': store['kp'],
+            'vis':    store['vis'],
+            'kp':     np.load(feats, mmap_mode='r'),
+        }
+
+    # ---- 용량 관리 ----
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for key in os.listdir(self.root):
+            d = self.entry_dir(key)
+            if not os.path.isdir(d):
+                continue
+            size = 0
+            for dirpath, _, files in os.walk(d):
+                for fn in files:
+                    try:
+                        size += os.path.getsize(os.path.join(dirpath, fn))
+                    except OSError:
+                        pass
+            stamp = os.path.join(d, STAMP_FILE)
+            used = os.path.getmtime(stamp) if os.path.exists(stamp) else 0.0
+            entries.append((used, size, key))
+        return entries
+
+    def usage(self) -> dict:
+        entries = self._entries()
+        return {
+            'entries':   len(entries),
+            'bytes':     sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+    def enforce_budget(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for used, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            with self._lock:
+                if key in self._in_use:
+                    continue
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            total -= size
+            print(f"[RefCache] evicted {key} ({size / 1e6:.1f} MB, "
+                  f"last used {time.ctime(used)})")
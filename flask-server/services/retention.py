@@ -0,0 +1,297 @@
+# flask-server/services/retention.py
+# DATA_DIR 아래 작업 폴더의 보존/정리.
+#   - 작업이 끝나면 중간 산출물(원본/싱크 영상, 프레임 JPEG, 키포인트 저장소, 구간 렌더링 등)을 바로 삭제
+#     (prune_intermediates 가 꺼져 있으면 남겨 둠 — SAVE_FRAMES 결과나 resume 용 stages/ 기록 보존)
+#   - 전체 용량이 max_bytes 를 넘으면 가장 오래 안 쓴 작업부터 통째로 삭제 (진행 중인 작업 제외)
+#   - 지워진 작업을 가리키는 중복 색인, 끝난 배치의 레퍼런스 캐시, 오래된 청크 업로드 정리
+# 정리는 sweep() 한 번으로 모두 수행되며 start() 로 백그라운드 스레드에서 주기적으로 돌립니다.
+
+import os
+import json
+import time
+import shutil
+import fnmatch
+import threading
+
+STATUS_FILE = 'job.json'
+BATCH_FILE  = 'batch.json'
+STAMP_FILE  = '.last_used'
+
+# 작업이 끝난 뒤에도 남기는 결과물 (작업 폴더 기준 상대 경로 패턴)
+DELIVERABLES = (
+    STATUS_FILE, STAMP_FILE, 'sync.json',
+    'final_feedback_with_audio.mp4',
+    'dancer_kp/feedback.json', 'dancer_kp/feedback.json.*',
+    'dancer_kp/scores.json', 'dancer_kp/scores.json.*',
+    'dancer_kp/similarity.npz',   # 재채점(rescore)에 필요
+    'rescores/*',
+)
+# 재채점 후 영상을 다시 렌더링할 때 필요한 원본 영상 (keep_sources 면 LRU 로 작업이 지워질 때까지 남김)
+SOURCE_VIDEOS = ('dancer.mp4', 'trainee.mp4', '*_synced.mp4')
+# 어디에 있든 항상 중간 산출물 (중단된 렌더링/쓰기)
+TEMPORARY = ('*.tmp', '*.tmp.*', '*_chunks/*')
+
+
+def classify(rel_path: str, keep_sources: bool = False) -> str:
+    """
+    작업 폴더 기준 상대 경로 → 'deliverable' | 'source' | 'intermediate'
+    """
+    rel = rel_path.replace(os.sep, '/')
+    if any(fnmatch.fnmatchcase(rel, p) for p in TEMPORARY):
+        return 'intermediate'
+    if any(fnmatch.fnmatchcase(rel, p) for p in DELIVERABLES):
+        return 'deliverable'
+    if any(fnmatch.fnmatchcase(rel, p) for p in SOURCE_VIDEOS):
+        return 'source' if keep_sources else 'intermediate'
+    return 'intermediate'
+
+
+def _walk_files(root: str):
+    # (상대 경로, 크기, mtime)
+    for dirpath, _, files in os.walk(root):
+        for fn in files:
+            path = os.path.join(dirpath, fn)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield os.path.relpath(path, root), st.st_size, st.st_mtime
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Retention:
+    """
+    data_dir 의 최상위 폴더를 작업(job.json), 배치(batch.json), 그 밖(업로드 중이거나 버려진 폴더)으로 나눠 관리합니다.
+    max_bytes 가 0 이면 용량 제한 없이 중간 산출물 정리만 합니다.
+    prune_intermediates 가 False 면 끝난 작업의 중간 산출물은 지우지 않고 용량 초과 시 작업 단위로만 삭제합니다.
+    grace_seconds 보다 오래 갱신되지 않은 queued/running 상태(서버가 죽어 남은 작업), 폴더, 업로드는 정리 대상
+    """
+
+    def __init__(self, data_dir: str, max_bytes: int, keep_sources: bool = True,
+                 prune_intermediates: bool = True,
+                 grace_seconds: float = 24 * 3600, queue=None, index=None, uploads=None):
+        self.data_dir      = data_dir
+        self.max_bytes     = max_bytes
+        self.keep_sources  = keep_sources
+        self.prune_intermediates = prune_intermediates
+        self.grace_seconds = grace_seconds
+        self.queue   = queue
+        self.index   = index
+        self.uploads = uploads
+        self._sweep_lock = threading.Lock()
+        self._thread = None
+        self._stop   = threading.Event()
+        self.last_sweep = None
+
+    # ---- 작업 단위 ----
+
+    def touch(self, job_id: str):
+        """
+        결과 조회/다운로드/재사용 때 호출해서 LRU 시각을 갱신
+        """
+        d = os.path.join(self.data_dir, job_id)
+        if not os.path.isfile(os.path.join(d, STATUS_FILE)):
+            return
+        stamp = os.path.join(d, STAMP_FILE)
+        try:
+            with open(stamp, 'a'):
+                pass
+            os.utime(stamp, None)
+        except OSError:
+            pass
+
+    def prune(self, work_dir: str) -> int:
+        """
+        끝난 작업 폴더에서 결과물이 아닌 파일을 지우고 빈 폴더를 정리합니다.
+        Returns: 지운 바이트 수
+        """
+        freed = 0
+        for rel, size, _ in list(_walk_files(work_dir)):
+            if classify(rel, self.keep_sources) != 'intermediate':
+                continue
+            try:
+                os.remove(os.path.join(work_dir, rel))
+                freed += size
+            except OSError:
+                pass
+        for dirpath, _, _ in sorted(os.walk(work_dir), key=lambda w: len(w[0]), reverse=True):
+            if dirpath != work_dir:
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+        return freed
+
+    def _active_dirs(self) -> set:
+        return {os.path.abspath(d) for d in self.queue.active_dirs()} if self.queue else set()
+
+    def _is_active(self, entry: dict, active: set) -> bool:
+        d = os.path.abspath(entry['path'])
+        if any(a == d or a.startswith(d + os.sep) for a in active):
+            return True
+        # 다른 프로세스에서 돌고 있을 수 있으므로 최근에 갱신된 진행 상태도 진행 중으로 봄
+        return (entry['status'] in ('queued', 'running')
+                and time.time() - entry['status_mtime'] < self.grace_seconds)
+
+    # ---- 스캔 ----
+
+    def _entries(self) -> list[dict]:
+        entries = []
+        try:
+            names = os.listdir(self.data_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            d = os.path.join(self.data_dir, name)
+            if not os.path.isdir(d):
+                continue
+            entry = {'name': name, 'path': d, 'bytes': 0, 'intermediate_bytes': 0,
+                     'status': None, 'status_mtime': 0.0, 'last_used': 0.0}
+            newest = 0.0
+            for rel, size, mtime in _walk_files(d):
+                entry['bytes'] += size
+                newest = max(newest, mtime)
+                if classify(rel, self.keep_sources) == 'intermediate':
+                    entry['intermediate_bytes'] += size
+            status_path = os.path.join(d, STATUS_FILE)
+            if os.path.isfile(status_path):
+                entry['kind'] = 'job'
+                entry['status'] = (_read_json(status_path) or {}).get('status')
+                entry['status_mtime'] = os.path.getmtime(status_path)
+                stamp = os.path.join(d, STAMP_FILE)
+                entry['last_used'] = max(entry['status_mtime'],
+                                         os.path.getmtime(stamp) if os.path.exists(stamp) else 0.0)
+            elif os.path.isfile(os.path.join(d, BATCH_FILE)):
+                entry['kind'] = 'batch'
+                entry['last_used'] = newest
+            else:
+                entry['kind'] = 'other'
+                entry['last_used'] = newest or os.path.getmtime(d)
+            entries.append(entry)
+        return entries
+
+    def usage(self) -> dict:
+        entries = self._entries()
+        jobs = [e for e in entries if e['kind'] == 'job']
+        return {
+            'jobs':               len(jobs),
+            'batches':            sum(e['kind'] == 'batch' for e in entries),
+            'bytes':              sum(e['bytes'] for e in entries),
+            'intermediate_bytes': sum(e['intermediate_bytes'] for e in jobs),
+            'max_bytes':          self.max_bytes,
+            'keep_sources':       self.keep_sources,
+            'prune_intermediates': self.prune_intermediates,
+            'last_sweep':         self.last_sweep,
+        }
+
+    # ---- 정리 ----
+
+    def _remove(self, entry: dict, reason: str):
+        shutil.rmtree(entry['path'], ignore_errors=True)
+        print(f"[Retention] removed {entry['kind']} {entry['name']} "
+              f"({entry['bytes'] / 1e6:.1f} MB, {reason})")
+
+    def sweep(self) -> dict:
+        """
+        1) 끝난 작업의 중간 산출물 삭제 (prune_intermediates 일 때만)  2) 오래된 버려진 폴더 삭제  3) 용량 초과 시 LRU 작업 삭제
+        4) 끝난 배치 정리  5) 없어진 작업을 가리키는 색인 삭제  6) 오래된 업로드 삭제
+        """
+        with self._sweep_lock:
+            now = time.time()
+            stats = {'pruned_bytes': 0, 'evicted': [], 'removed': []}
+            entries = self._entries()
+            active  = self._active_dirs()
+
+            for e in entries:
+                if e['kind'] == 'job':
+                    e['active'] = self._is_active(e, active)
+                    if (self.prune_intermediates and not e['active']
+                            and e['status'] == 'done' and e['intermediate_bytes']):
+                        freed = self.prune(e['path'])
+                        e['bytes'] -= freed
+                        e['intermediate_bytes'] = 0
+                        stats['pruned_bytes'] += freed
+                elif e['kind'] == 'other' and now - e['last_used'] > self.grace_seconds:
+                    self._remove(e, 'abandoned')
+                    stats['removed'].append(e['name'])
+                    e['bytes'] = 0
+
+            # 용량 초과 → 가장 오래 안 쓴 작업부터 (색인 lock 을 잡아 중복 요청이 지워지는 작업에 합류하지 않게 함)
+            jobs  = sorted((e for e in entries if e['kind'] == 'job'), key=lambda e: e['last_used'])
+            total = sum(e['bytes'] for e in entries)
+            for e in jobs:
+                if self.max_bytes <= 0 or total <= self.max_bytes:
+                    break
+                if e['active']:
+                    continue
+                with self._index_lock():
+                    self._remove(e, f"LRU, last used {time.ctime(e['last_used'])}")
+                    if self.queue is not None:
+                        self.queue.forget(e['name'], e['path'])
+                total -= e['bytes']
+                e['kind'] = 'evicted'
+                stats['evicted'].append(e['name'])
+            alive = {e['name'] for e in entries if e['kind'] == 'job'}
+
+            for e in entries:
+                if e['kind'] == 'batch':
+                    self._sweep_batch(e, alive, active, stats)
+
+            self._sweep_index()
+            if self.uploads is not None:
+                stats['expired_uploads'] = self.uploads.expire(self.grace_seconds)
+
+            stats['bytes'] = total
+            self.last_sweep = dict(stats, time=now)
+            return stats
+
+    def _index_lock(self):
+        return self.index.lock if self.index is not None else threading.Lock()
+
+    def _sweep_batch(self, entry: dict, alive: set, active: set, stats: dict):
+        batch = _read_json(os.path.join(entry['path'], BATCH_FILE)) or {}
+        job_ids = [j['job_id'] for j in batch.get('jobs', [])]
+        remaining = [j for j in job_ids if j in alive]
+        if not remaining:
+            self._remove(entry, 'all jobs removed')
+            stats['removed'].append(entry['name'])
+            return
+        # 배치 전용 레퍼런스 캐시는 배치의 작업이 모두 끝나면 필요 없음
+        reference = os.path.join(entry['path'], 'reference')
+        busy = any(os.path.abspath(os.path.join(self.data_dir, j)) in active for j in remaining)
+        if os.path.isdir(reference) and not busy:
+            shutil.rmtree(reference, ignore_errors=True)
+
+    def _sweep_index(self):
+        if self.index is None:
+            return
+        with self.index.lock:
+            for key, job_id in self.index.entries().items():
+                if not os.path.isdir(os.path.join(self.data_dir, job_id)):
+                    self.index.forget(key)
+
+    # ---- 백그라운드 ----
+
+    def start(self, interval: float):
+        if self._thread is not None or interval <= 0:
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"[Retention] sweep failed: {e}")
+
+        self._thread = threading.Thread(target=_loop, name='retention-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,307 @@
+# flask-server/services/uploads.py
+# 이어 올리기가 가능한 청크 업로드.
+# 요청 본문을 그대로 디스크에 흘려 쓰면서 sha256 을 계산하고, 앞부분이 도착하는 대로
+# ffprobe 로 컨테이너 헤더를 확인해서 잘못된 영상은 업로드가 끝나기 전에 거절합니다.
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+import subprocess
+from fractions import Fraction
+from contextlib import ExitStack
+
+META_SUFFIX = '.json'
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra  = extra
+
+
+def probe_video(path: str) -> dict:
+    """
+    ffprobe 로 길이/FPS/해상도/오디오 유무를 읽습니다. 아직 헤더를 읽을 수 없으면 None
+    (moov 가 파일 끝에 있는 mp4 는 다 올라오기 전까지 읽을 수 없음)
+    ffprobe 를 실행할 수 없을 때(설치 안 됨 등)도 읽지 못한 것으로 봅니다.
+    """
+    try:
+        proc = subprocess.run([
+            "ffprobe", "-v", "error", "-print_format", "json",
+            "-show_format", "-show_streams", path
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    try:
+        info = json.loads(proc.stdout or b'{}')
+    except ValueError:
+        return None
+    streams = info.get('streams') or []
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    duration = float((info.get('format') or {}).get('duration') or 0.0)
+    fps = 0.0
+    if video is not None:
+        try:
+            fps = float(Fraction(video.get('avg_frame_rate') or video.get('r_frame_rate') or '0/1'))
+        except (ValueError, ZeroDivisionError):
+            fps = 0.0
+    return {
+        'duration':  duration,
+        'fps':       fps,
+        'width':     int(video.get('width', 0)) if video else 0,
+        'height':    int(video.get('height', 0)) if video else 0,
+        'has_video': video is not None,
+        'has_audio': audio is not None,
+    }
+
+
+class Upload:
+    def __init__(self, upload_id: str, path: str, size: int, filename: str = None,
+                 offset: int = 0, probe: dict = None, sha256: str = None):
+        self.upload_id = upload_id
+        self.path      = path
+        self.size      = size
+        self.filename  = filename
+        self.offset    = offset
+        self.probe     = probe
+        self.sha256    = sha256
+        self.lock      = threading.Lock()
+        self._hasher   = None
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.size
+
+    def to_dict(self) -> dict:
+        return {
+            'upload_id': self.upload_id,
+            'filename':  self.filename,
+            'size':      self.size,
+            'offset':    self.offset,
+            'complete':  self.complete,
+            'probe':     self.probe,
+            'sha256':    self.sha256,
+        }
+
+
+class UploadStore:
+    """
+    root/<upload_id>.part 에 데이터를, root/<upload_id>.json 에 진행 상태를 저장합니다.
+    서버가 재시작돼도 GET 으로 offset 을 확인하고 그 위치부터 이어서 올릴 수 있습니다.
+    """
+
+    def __init__(self, root: str, max_bytes: int, max_seconds: float, max_pixels: int,
+                 probe_bytes: int = 4 << 20, chunk_size: int = 1 << 20):
+        self.root        = root
+        self.max_bytes   = max_bytes
+        self.max_seconds = max_seconds
+        self.max_pixels  = max_pixels
+        self.probe_bytes = probe_bytes
+        self.chunk_size  = chunk_size
+        self._uploads    = {}
+        self._lock       = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, upload_id + META_SUFFIX)
+
+    def _save(self, up: Upload):
+        path = self._meta_path(up.upload_id)
+        tmp  = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(up.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def create(self, size: int, filename: str = None) -> Upload:
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise UploadError("size(바이트)를 지정하세요")
+        if size > self.max_bytes:
+            raise UploadError(f"파일이 너무 큽니다 (최대 {self.max_bytes} 바이트)", 413)
+        upload_id = uuid.uuid4().hex
+        up = Upload(upload_id, os.path.join(self.root, upload_id + '.part'), size, filename)
+        open(up.path, 'wb').close()
+        up._hasher = hashlib.sha256()
+        with self._lock:
+            self._uploads[upload_id] = up
+        self._save(up)
+        return up
+
+    def get(self, upload_id: str) -> Upload:
+        with self._lock:
+            up = self._uploads.get(upload_id)
+            if up is not None:
+                return up
+            meta = self._meta_path(upload_id)
+            if not os.path.isfile(meta):
+                return None
+            with open(meta, 'r', encoding='utf-8') as f:
+                d = json.load(f)
+            up = Upload(upload_id, os.path.join(self.root, upload_id + '.part'), d['size'],
+                        d.get('filename'), d['offset'], d.get('probe'), d.get('sha256'))
+            self._uploads[upload_id] = up
+            return up
+
+    def append(self, upload_id: str, offset: int, stream) -> Upload:
+        """
+        offset 위치부터 stream 을 이어 씁니다. offset 이 현재 위치와 다르면 409
+        """
+        up = self.get(upload_id)
+        if up is None:
+            raise UploadError("존재하지 않는 업로드입니다", 404)
+        with up.lock:
+            if offset != up.offset:
+                raise UploadError("offset 이 맞지 않습니다", 409, offset=up.offset)
+            if up.complete:
+                return up
+            if up._hasher is None:
+                # 재시작 뒤 이어 올리기: 저장된 offset 까지만 다시 해시
+                # (끊긴 PATCH 가 offset 뒤에 남긴 데이터는 아래에서 잘라냄)
+                up._hasher = hashlib.sha256()
+                with open(up.path, 'rb') as f:
+                    remaining = up.offset
+                    while remaining:
+                        chunk = f.read(min(self.chunk_size, remaining))
+                        if not chunk:
+                            break
+                        up._hasher.update(chunk)
+                        remaining -= len(chunk)
+
+            # 1) 본문을 청크 단위로 흘려 쓰면서 해시 (요청이 끊겨도 받은 만큼은 offset 으로 남김)
+            try:
+                with open(up.path, 'r+b') as f:
+                    f.truncate(up.offset)
+                    f.seek(up.offset)
+                    while True:
+                        chunk = stream.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        if up.offset + len(chunk) > up.size:
+                            f.truncate(up.offset)
+                            raise UploadError("선언한 size 보다 많은 데이터가 왔습니다", 413)
+                        f.write(chunk)
+                        up._hasher.update(chunk)
+                        up.offset += len(chunk)
+            finally:
+                self._save(up)
+
+            # 2) 헤더를 읽을 수 있을 만큼 왔으면 바로 검사, 다 오면 반드시 검사
+            if up.probe is None and (up.complete or up.offset >= self.probe_bytes):
+                up.probe = probe_video(up.path)
+                if up.probe is None and up.complete:
+                    self._reject(up, "영상 파일을 읽을 수 없습니다")
+                if up.probe is not None:
+                    self._validate(up)
+
+            if up.complete:
+                up.sha256 = up._hasher.hexdigest()
+            self._save(up)
+        return up
+
+    def _validate(self, up: Upload):
+        p = up.probe
+        if not p['has_video']:
+            self._reject(up, "비디오 스트림이 없습니다")
+        if not p['has_audio']:
+            self._reject(up, "오디오 스트림이 없습니다 (싱크에 필요)")
+        if p['duration'] > self.max_seconds:
+            self._reject(up, f"영상이 너무 깁니다 (최대 {self.max_seconds:.0f}초)")
+        if p['width'] * p['height'] > self.max_pixels:
+            self._reject(up, "해상도가 너무 큽니다")
+        if not 1.0 <= p['fps'] <= 240.0:
+            self._reject(up, "FPS 를 확인할 수 없습니다")
+
+    def _reject(self, up: Upload, message: str):
+        probe = up.probe
+        self.discard(up.upload_id)
+        raise UploadError(message, 422, probe=probe)
+
+    def take(self, upload_id: str, dst: str) -> Upload:
+        """
+        끝난 업로드 파일을 dst 로 옮기고 세션을 지웁니다.
+        """
+        return self.take_all([(upload_id, dst)])[0]
+
+    def take_all(self, targets: list) -> list:
+        """
+        [(upload_id, dst), ...] 를 한꺼번에 옮깁니다.
+        하나라도 없거나 덜 끝났으면 아무것도 옮기지 않으므로 클라이언트는 업로드를 다시 올릴 필요가 없습니다.
+        Returns: Upload 목록 (targets 순서)
+        """
+        ups = []
+        for upload_id, _ in targets:
+            up = self.get(upload_id)
+            if up is None:
+                raise UploadError("존재하지 않는 업로드입니다", 404, upload_id=upload_id)
+            ups.append(up)
+        if len({up.upload_id for up in ups}) != len(ups):
+            raise UploadError("같은 업로드를 두 번 사용할 수 없습니다")
+
+        with ExitStack() as stack:
+            # 1) 모두 잠그고(항상 같은 순서) 옮길 수 있는지 먼저 확인
+            for up in sorted(ups, key=lambda u: u.upload_id):
+                stack.enter_context(up.lock)
+            for up in ups:
+                if not os.path.isfile(up.path):
+                    raise UploadError("존재하지 않는 업로드입니다", 404, upload_id=up.upload_id)
+                if not up.complete or up.sha256 is None:
+                    raise UploadError("업로드가 아직 끝나지 않았습니다", 409, **up.to_dict())
+            # 2) 옮기다 실패하면 이미 옮긴 파일은 되돌림
+            moved = []
+            try:
+                for up, (_, dst) in zip(ups, targets):
+                    shutil.move(up.path, dst)
+                    moved.append((up, dst))
+            except OSError:
+                for up, dst in moved:
+                    shutil.move(dst, up.path)
+                raise
+        for up in ups:
+            self.discard(up.upload_id)
+        return ups
+
+    def discard(self, upload_id: str):
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+        for path in (os.path.join(self.root, upload_id + '.part'), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def expire(self, max_age: float) -> int:
+        """
+        max_age 초 동안 이어 올리지 않은 업로드 세션을 지웁니다.
+        Returns: 지운 세션 수
+        """
+        now, expired = time.time(), 0
+        for name in os.listdir(self.root):
+            if not name.endswith(META_SUFFIX):
+                continue
+            upload_id = name[:-len(META_SUFFIX)]
+            paths = [os.path.join(self.root, name), os.path.join(self.root, upload_id + '.part')]
+            try:
+                touched = max(os.path.getmtime(p) for p in paths if os.path.exists(p))
+            except ValueError:
+                continue
+            if now - touched > max_age:
+                self.discard(upload_id)
+                expired += 1
+        return expired
+
+    def usage(self) -> dict:
+        sessions = [n for n in os.listdir(self.root) if n.endswith(META_SUFFIX)]
+        size = 0
+        for name in os.listdir(self.root):
+            try:
+                size += os.path.getsize(os.path.join(self.root, name))
+            except OSError:
+                pass
+        return {'uploads': len(sessions), 'bytes': size}
@@ -0,0 +1,7 @@
+# flask-server/tests/conftest.py
+# flask-server 폴더를 import 경로에 추가 (python -m pytest -q 를 flask-server 에서 실행)
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
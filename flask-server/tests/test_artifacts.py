@@ -0,0 +1,19 @@
+# flask-server/tests/test_artifacts.py
+
+import os
+
+from services.artifacts import strong_etag
+
+
+def test_etag_changes_when_artifact_is_rewritten(tmp_path):
+    path = str(tmp_path / 'scores.json')
+    with open(path, 'w') as f:
+        f.write('{"score": 1}')
+    first = strong_etag(path)
+    assert strong_etag(path) == first
+
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write('{"score": 2}')
+    os.replace(tmp, path)
+    assert strong_etag(path) != first
@@ -0,0 +1,34 @@
+# flask-server/tests/test_checkpoints.py
+
+import os
+
+import numpy as np
+
+from services.checkpoints import Checkpoints
+
+
+def _complete_stage(work: str):
+    ckpt = Checkpoints(work)
+    out = os.path.join(work, 'dancer_kp', 'keypoints.npy')
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    np.save(out, np.arange(64, dtype=np.float32))
+    fp = ckpt.fingerprint('extract_dancer', video='abc')
+    ckpt.complete('extract_dancer', fp, [out])
+    return ckpt, fp, out
+
+
+def test_unchanged_output_is_reused(tmp_path):
+    ckpt, fp, _ = _complete_stage(str(tmp_path))
+    assert ckpt.valid('extract_dancer', fp) is not None
+
+
+def test_same_size_corruption_reruns_stage(tmp_path):
+    ckpt, fp, out = _complete_stage(str(tmp_path))
+    size = os.path.getsize(out)
+    with open(out, 'r+b') as f:
+        f.seek(size - 1)
+        last = f.read(1)
+        f.seek(size - 1)
+        f.write(bytes([last[0] ^ 0xFF]))
+    assert os.path.getsize(out) == size
+    assert ckpt.valid('extract_dancer', fp) is None
@@ -0,0 +1,37 @@
+# flask-server/tests/test_extract_pool.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.extract_pool import SegmentedExtract, abandon
+
+
+def _slow(finished: list, seconds: float):
+    time.sleep(seconds)
+    finished.append(seconds)
+
+
+def _fail():
+    raise RuntimeError("segment failed")
+
+
+def test_abandon_cancels_pending_and_waits_for_running():
+    finished = []
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        running = ex.submit(_slow, finished, 0.3)
+        pending = ex.submit(_slow, finished, 0.0)
+        time.sleep(0.05)
+        abandon(SegmentedExtract([running, pending], 'unused', save=None))
+        assert running.done() and finished == [0.3]
+        assert pending.cancelled()
+
+
+def test_failed_segment_waits_for_running_segments():
+    finished = []
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        futures = [ex.submit(_slow, finished, 0.3), ex.submit(_fail), ex.submit(_slow, finished, 0.0)]
+        with pytest.raises(RuntimeError):
+            SegmentedExtract(futures, 'unused', save=None).result()
+        assert futures[0].done()
@@ -0,0 +1,47 @@
+# flask-server/tests/test_model_status.py
+# 병렬 추출 모드(기본값)에서 모델은 추출 풀 워커에만 올라가므로 그 상태가 보고되는지 확인
+
+import os
+import time
+
+import pytest
+
+from services.extract_pool import ExtractPool
+
+
+def test_pool_workers_report_model_status():
+    pool = ExtractPool(processes=1, cpu_budget=1)
+    try:
+        pool.prestart()
+        workers = {}
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            workers = {name: models for name, models in pool.model_status().items()
+                       if not name.startswith(f"{os.getpid()}/")}
+            if workers:
+                break
+            time.sleep(0.2)
+        assert workers, "pool worker never reported its model status"
+        # 워밍업이 끝났으면 모델별 로드 시간, 모델 패키지가 없으면 error 가 기록됨
+        for models in workers.values():
+            assert set(models) & {"yolo", "pose_static", "error"}
+    finally:
+        pool._pool.shutdown(cancel_futures=True)
+
+
+def test_models_endpoint_merges_pool_status(monkeypatch):
+    pytest.importorskip("mediapipe")
+    from flask import Flask
+    from views.compare import compare_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(compare_bp, url_prefix='/compare')
+
+    class FakePool:
+        def model_status(self):
+            return {"4242/MainThread": {"yolo": {"warmed": True, "load_sec": 1.0}}}
+
+    monkeypatch.setattr("views.compare.get_extract_pool", lambda: FakePool())
+    res = app.test_client().get('/compare/models')
+    assert res.status_code == 200
+    assert res.get_json()["4242/MainThread"]["yolo"]["warmed"] is True
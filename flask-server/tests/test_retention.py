@@ -0,0 +1,36 @@
+# flask-server/tests/test_retention.py
+
+import os
+import json
+
+from services.retention import Retention
+
+
+def _make_done_job(data_dir: str, job_id: str) -> str:
+    work = os.path.join(data_dir, job_id)
+    for rel in ('stages/extract_trainee.json', 'trainee_kp/frames/frame_00000000.jpg',
+                'dancer_kp/similarity.npz'):
+        path = os.path.join(work, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 16)
+    with open(os.path.join(work, 'job.json'), 'w', encoding='utf-8') as f:
+        json.dump({'status': 'done'}, f)
+    return work
+
+
+def test_sweep_keeps_intermediates_when_pruning_is_off(tmp_path):
+    work = _make_done_job(str(tmp_path), 'job1')
+    stats = Retention(str(tmp_path), max_bytes=0, prune_intermediates=False).sweep()
+    assert stats['pruned_bytes'] == 0
+    assert os.path.isfile(os.path.join(work, 'stages', 'extract_trainee.json'))
+    assert os.path.isfile(os.path.join(work, 'trainee_kp', 'frames', 'frame_00000000.jpg'))
+
+
+def test_sweep_prunes_intermediates_by_default(tmp_path):
+    work = _make_done_job(str(tmp_path), 'job1')
+    stats = Retention(str(tmp_path), max_bytes=0).sweep()
+    assert stats['pruned_bytes'] == 32
+    assert not os.path.exists(os.path.join(work, 'stages'))
+    assert not os.path.exists(os.path.join(work, 'trainee_kp'))
+    assert os.path.isfile(os.path.join(work, 'dancer_kp', 'similarity.npz'))
@@ -0,0 +1,52 @@
+# flask-server/tests/test_uploads.py
+
+import os
+
+import pytest
+
+from services.uploads import UploadStore, UploadError, probe_video
+
+
+def _store(tmp_path) -> UploadStore:
+    return UploadStore(str(tmp_path / 'uploads'), max_bytes=1 << 20, max_seconds=60, max_pixels=1920 * 1080)
+
+
+def _finished(store: UploadStore, data: bytes):
+    up = store.create(len(data))
+    with open(up.path, 'wb') as f:
+        f.write(data)
+    up.offset, up.sha256 = len(data), '0' * 64
+    return up
+
+
+def test_take_all_moves_nothing_when_one_upload_is_unfinished(tmp_path):
+    store = _store(tmp_path)
+    done = _finished(store, b'dancer')
+    partial = store.create(16)
+    dst = [str(tmp_path / 'dancer.mp4'), str(tmp_path / 'trainee.mp4')]
+
+    with pytest.raises(UploadError) as e:
+        store.take_all([(done.upload_id, dst[0]), (partial.upload_id, dst[1])])
+    assert e.value.status == 409
+    assert os.path.isfile(done.path) and not os.path.exists(dst[0])
+    assert store.get(done.upload_id) is not None
+
+    other = _finished(store, b'trainee')
+    ups = store.take_all([(done.upload_id, dst[0]), (other.upload_id, dst[1])])
+    assert [u.upload_id for u in ups] == [done.upload_id, other.upload_id]
+    assert open(dst[0], 'rb').read() == b'dancer'
+    assert store.get(done.upload_id) is None
+
+
+def test_take_all_rejects_unknown_upload(tmp_path):
+    store = _store(tmp_path)
+    done = _finished(store, b'dancer')
+    with pytest.raises(UploadError) as e:
+        store.take_all([(done.upload_id, str(tmp_path / 'a.mp4')), ('f' * 32, str(tmp_path / 'b.mp4'))])
+    assert e.value.status == 404
+    assert os.path.isfile(done.path)
+
+
+def test_probe_without_ffprobe_is_a_probe_failure(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    assert probe_video(str(tmp_path / 'missing.mp4')) is None
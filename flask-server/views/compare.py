@@ -1,26 +1,453 @@
 # flask-server/views/compare_view.py
 
 import os
+import re
+import json
 import uuid
-import time
-import subprocess
+import hashlib
+import shutil
 from flask import Blueprint, current_app, request, jsonify, send_from_directory
+from werkzeug.utils import secure_filename
 
 from pipeline.extract_keypoints.sound_sync              import sync_pair
 from pipeline.extract_keypoints.yolo_and_mediapipe_pose import extract_keypoints
-from pipeline.similarity.main                          import compute_feedback
-from pipeline.extract_keypoints.img_to_video_feedback   import render_feedback_video
+from pipeline.similarity.main                          import (
+    compute_feedback, score_feedback, load_similarity, similarity_from_features, trim_to_common_length,
+    similarity_settings, SIMILARITY_FILE
+)
+from pipeline.extract_keypoints.img_to_video_feedback   import render_feedback_stream
+from pipeline.similarity.data_utils                    import load_pose_keypoints, keypoint_store_files
+from pipeline.extract_keypoints.model_registry          import warm_up, registry_status
+from services.job_queue                                 import JobQueue
+from services.reference_cache                           import ReferenceCache, extraction_settings, file_sha256
+from services.extract_pool                              import ExtractPool, abandon
+from services.job_index                                 import JobIndex, job_key, save_with_hash
+from services.uploads                                   import UploadStore, UploadError
+from services.artifacts                                 import precompress
+from services.retention                                 import Retention
+from services.checkpoints                               import Checkpoints
 
 compare_bp = Blueprint('compare', __name__, url_prefix='/compare')
 
+JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+SYNC_FILE = 'sync.json'
+BATCH_FILE = 'batch.json'
+
+# POST /compare/<job_id>/rescore 에서 바꿀 수 있는 채점 파라미터와 기본값
+RESCORE_DEFAULTS = {
+    'angle_weight':        0.6,
+    'angle_report_thresh': 10.0,
+    'proc_thresh':         0.1,
+    'percentile':          95.0,
+}
+
+
+def init_job_queue(app) -> JobQueue:
+    """
+    앱마다 하나의 워커 풀을 만들어 app.extensions 에 보관합니다.
+    각 워커는 시작할 때 YOLO/Pose 를 로드·워밍업합니다.
+    병렬 추출 모드에서는 추론이 모두 추출 프로세스 풀에서 돌기 때문에 워커 스레드는 모델을 올리지 않습니다.
+    """
+    queue = app.extensions.get('job_queue')
+    if queue is None:
+        queue = JobQueue(
+            max_workers=app.config.get('MAX_CONCURRENT_JOBS', 2),
+            initializer=None if app.config.get('PARALLEL_EXTRACT') else warm_up
+        )
+        if app.config.get('WARM_MODELS_ON_STARTUP') and not app.config.get('PARALLEL_EXTRACT'):
+            queue.prestart()
+        app.extensions['job_queue'] = queue
+    return queue
+
+
+def get_job_queue() -> JobQueue:
+    return init_job_queue(current_app._get_current_object())
+
+
+def init_reference_cache(app) -> ReferenceCache:
+    cache = app.extensions.get('reference_cache')
+    if cache is None:
+        cache = ReferenceCache(
+            app.config['REFERENCE_CACHE_DIR'],
+            max_bytes=app.config.get('REFERENCE_CACHE_MAX_BYTES', 0)
+        )
+        app.extensions['reference_cache'] = cache
+    return cache
+
+
+def get_reference_cache() -> ReferenceCache:
+    return init_reference_cache(current_app._get_current_object())
+
+
+def init_job_index(app) -> JobIndex:
+    index = app.extensions.get('job_index')
+    if index is None:
+        index = JobIndex(app.config['JOB_INDEX_DIR'])
+        app.extensions['job_index'] = index
+    return index
+
+
+def get_job_index() -> JobIndex:
+    return init_job_index(current_app._get_current_object())
+
+
+def init_upload_store(app) -> UploadStore:
+    store = app.extensions.get('upload_store')
+    if store is None:
+        store = UploadStore(
+            app.config['UPLOAD_DIR'],
+            max_bytes=app.config.get('MAX_UPLOAD_BYTES', 2 * 1024**3),
+            max_seconds=app.config.get('MAX_VIDEO_SECONDS', 20 * 60),
+            max_pixels=app.config.get('MAX_VIDEO_PIXELS', 3840 * 2160),
+            probe_bytes=app.config.get('UPLOAD_PROBE_BYTES', 4 * 1024**2)
+        )
+        app.extensions['upload_store'] = store
+    return store
+
+
+def get_upload_store() -> UploadStore:
+    return init_upload_store(current_app._get_current_object())
+
+
+def init_extract_pool(app) -> ExtractPool:
+    """
+    병렬 추출 모드일 때만 모든 작업이 공유하는 추출 프로세스 풀을 만듭니다.
+    """
+    if not app.config.get('PARALLEL_EXTRACT'):
+        return None
+    pool = app.extensions.get('extract_pool')
+    if pool is None:
+        pool = ExtractPool(
+            processes=app.config.get('EXTRACT_PROCESSES', 2),
+            cpu_budget=app.config.get('CPU_BUDGET', os.cpu_count() or 1),
+            segment_frames=app.config.get('EXTRACT_SEGMENT_FRAMES', 0),
+            segment_warmup=app.config.get('EXTRACT_SEGMENT_WARMUP', 30),
+            render_chunk_frames=app.config.get('RENDER_CHUNK_FRAMES', 0)
+        )
+        if app.config.get('WARM_MODELS_ON_STARTUP'):
+            pool.prestart()
+        app.extensions['extract_pool'] = pool
+    return pool
+
+
+def get_extract_pool() -> ExtractPool:
+    return init_extract_pool(current_app._get_current_object())
+
+
+def init_retention(app) -> Retention:
+    """
+    작업 폴더 정리기. RETENTION_SWEEP_SECONDS 마다 백그라운드에서 sweep() 을 실행합니다.
+    """
+    retention = app.extensions.get('retention')
+    if retention is None:
+        retention = Retention(
+            app.config['DATA_DIR'],
+            max_bytes=app.config.get('DATA_MAX_BYTES', 0),
+            keep_sources=app.config.get('KEEP_SOURCE_VIDEOS', True),
+            prune_intermediates=app.config.get('PRUNE_INTERMEDIATES', True),
+            grace_seconds=app.config.get('RETENTION_GRACE_SECONDS', 24 * 3600),
+            queue=init_job_queue(app),
+            index=init_job_index(app),
+            uploads=init_upload_store(app)
+        )
+        retention.start(app.config.get('RETENTION_SWEEP_SECONDS', 0))
+        app.extensions['retention'] = retention
+    return retention
+
+
+def get_retention() -> Retention:
+    return init_retention(current_app._get_current_object())
+
+
+def run_compare_job(job, work: str, dancer_path: str, trainee_path: str,
+                    ref_cache: ReferenceCache = None, extract_pool: ExtractPool = None,
+                    trim: str = 'offsets', ref_key: str = None, retention: Retention = None,
+                    input_hashes: tuple = None) -> dict:
+    """
+    싱크 → 키포인트 추출 → 피드백 → 렌더링(오디오 포함)까지 실행하고
+    결과물 경로(DATA_DIR 기준 상대 경로)를 반환합니다. 워커 스레드에서 호출됩니다.
+    단계마다 work/stages/ 에 완료 기록을 남기고, 같은 입력으로 이미 끝난 단계는 건너뜁니다 (resume).
+    ref_key: 이미 계산해 둔 레퍼런스 캐시 키 (배치 작업에서 댄서 영상 해시를 한 번만 계산)
+    retention: 주어지면 끝난 뒤 중간 산출물을 바로 지움 (실패한 작업은 그대로 둠)
+    input_hashes: 업로드하면서 계산한 (댄서, 연습생) 영상 sha256 (없으면 여기서 계산)
+    """
+    if ref_cache is None or not ref_cache.enabled:
+        ref_key = None
+    elif ref_key is None:
+        ref_key = ref_cache.key_for(dancer_path, extraction_settings())
+    if ref_key:
+        ref_cache.acquire(ref_key)
+    try:
+        result = _run_compare(job, work, dancer_path, trainee_path, ref_cache, ref_key,
+                              extract_pool, trim, input_hashes)
+        if retention is not None:
+            freed = retention.prune(work)
+            print(f"[Retention] {job.job_id}: pruned {freed / 1e6:.1f} MB of intermediates")
+        return result
+    finally:
+        if ref_key:
+            ref_cache.release(ref_key)
+
+
+def _run_compare(job, work, dancer_path, trainee_path, ref_cache, ref_key, extract_pool, trim,
+                 input_hashes) -> dict:
+    ck = Checkpoints(work)
+    dancer_hash, trainee_hash = input_hashes or (file_sha256(dancer_path), file_sha256(trainee_path))
+    ck.save_inputs(dancer=dancer_hash, trainee=trainee_hash)
+
+    # 4) 싱크 (레퍼런스 캐시가 있으면 댄서 오디오는 다시 디코딩하지 않음)
+    #    offsets 모드에서는 영상을 자르지 않고 시작 프레임/길이만 받아 이후 단계에서 seek
+    sync_fp = ck.fingerprint('sync', dancer=dancer_hash, trainee=trainee_hash, trim=trim)
+    sync_m  = ck.valid('sync', sync_fp)
+    if sync_m is not None:
+        job.skip('sync')
+    else:
+        ck.invalidate('sync')
+        with job.stage_timer('sync'):
+            audio1 = ref_cache.get_audio(ref_key, dancer_path) if ref_key else None
+            synced_dancer, synced_trainee, sync_info = sync_pair(
+                dancer_path, trainee_path, work, audio1=audio1, return_info=True, trim=trim
+            )
+            # 재채점 후 다시 렌더링할 때 쓸 싱크 정보
+            sync_json = os.path.join(work, SYNC_FILE)
+            with open(sync_json, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'dancer_video':  os.path.basename(synced_dancer),
+                    'trainee_video': os.path.basename(synced_trainee),
+                    'start_frames':  sync_info['start_frames'],
+                    'num_frames':    sync_info['num_frames'],
+                    'fps':           sync_info['fps'],
+                }, f)
+            sync_m = ck.complete('sync', sync_fp, [sync_json, synced_dancer, synced_trainee], data={
+                'info':          sync_info,
+                'dancer_video':  os.path.basename(synced_dancer),
+                'trainee_video': os.path.basename(synced_trainee),
+            })
+    sync_info      = sync_m['data']['info']
+    synced_dancer  = os.path.join(work, sync_m['data']['dancer_video'])
+    synced_trainee = os.path.join(work, sync_m['data']['trainee_video'])
+    d_start, t_start = sync_info['start_frames']
+    n_frames = sync_info['num_frames']
+
+    d_kp = os.path.join(work, 'dancer_kp')
+    t_kp = os.path.join(work, 'trainee_kp')
+    os.makedirs(d_kp, exist_ok=True)
+    os.makedirs(t_kp, exist_ok=True)
+
+    # 5~6) 병렬 모드: 연습생 추출을 먼저 프로세스 풀에 넘겨 두고 댄서 쪽과 동시에 진행
+    #      (긴 영상은 풀 안에서 구간별로 나뉘어 여러 프로세스가 나눠 처리)
+    settings = extraction_settings()
+    usr_fp = ck.fingerprint('extract_trainee', sync=sync_m['digest'], settings=settings)
+    usr_m  = ck.valid('extract_trainee', usr_fp)
+    if usr_m is None:
+        ck.invalidate('extract_trainee')
+    if extract_pool is not None:
+        extract    = extract_pool.run_extract
+        usr_future = (extract_pool.submit_extract(synced_trainee, t_kp,
+                                                  start_frame=t_start, num_frames=n_frames)
+                      if usr_m is None else None)
+    else:
+        extract    = extract_keypoints
+        usr_future = None
+
+    # 5) 키포인트 추출 (댄서)
+    #    캐시는 원본 전체 길이 기준이므로 싱크 시작 프레임만큼 잘라서 사용 (캐시 자체가 체크포인트)
+    #    여기서 실패하면 미리 넘겨 둔 연습생 추출은 취소하고, 이미 돌고 있으면 끝날 때까지 기다림
+    #    (실패 처리 후에도 워커가 작업 폴더에 쓰면 정리/resume 과 겹침)
+    try:
+        if ref_key:
+            with job.stage_timer('extract_dancer'):
+                ref        = ref_cache.get_keypoints(ref_key, dancer_path, extractor=extract)
+                ref_offset = int(round(sync_info['start1'] * sync_info['fps']))
+                ref_json   = ref['path']
+                ref_end    = ref_offset + n_frames
+                ref_kp     = (ref['kp_raw'][ref_offset:ref_end], ref['vis'][ref_offset:ref_end])
+                ref_data   = (ref_kp[0], ref_kp[1], ref['kp'][ref_offset:ref_end])
+            ref_digest = ck.fingerprint('extract_dancer', cache=ref_key, offset=ref_offset, frames=n_frames)
+        else:
+            ref_kp, ref_data = None, None
+            ref_fp = ck.fingerprint('extract_dancer', sync=sync_m['digest'], settings=settings)
+            ref_m  = ck.valid('extract_dancer', ref_fp)
+            if ref_m is not None:
+                job.skip('extract_dancer')
+            else:
+                ck.invalidate('extract_dancer')
+                with job.stage_timer('extract_dancer'):
+                    _, ref_json, _ = extract(synced_dancer, d_kp, start_frame=d_start, num_frames=n_frames)
+                    ref_m = ck.complete('extract_dancer', ref_fp, keypoint_store_files(ref_json),
+                                        data={'keypoints': os.path.relpath(ref_json, work)})
+            ref_json   = os.path.join(work, ref_m['data']['keypoints'])
+            ref_digest = ref_m['digest']
+    except BaseException:
+        if usr_future is not None:
+            abandon(usr_future)
+        raise
+
+    # 6) 키포인트 추출 (연습생)
+    if usr_m is not None:
+        job.skip('extract_trainee')
+    else:
+        if usr_future is not None:
+            (_, usr_json, _), elapsed = usr_future.result()
+            job.record('extract_trainee', elapsed)
+        else:
+            with job.stage_timer('extract_trainee'):
+                _, usr_json, _ = extract_keypoints(synced_trainee, t_kp,
+                                                   start_frame=t_start, num_frames=n_frames)
+        usr_m = ck.complete('extract_trainee', usr_fp, keypoint_store_files(usr_json),
+                            data={'keypoints': os.path.relpath(usr_json, work)})
+    usr_json = os.path.join(work, usr_m['data']['keypoints'])
+
+    # 7) 피드백 계산
+    fb_fp = ck.fingerprint('feedback', dancer=ref_digest, trainee=usr_m['digest'],
+                           settings=similarity_settings())
+    fb_m  = ck.valid('feedback', fb_fp)
+    if fb_m is not None:
+        job.skip('feedback')
+    else:
+        ck.invalidate('feedback')
+        with job.stage_timer('feedback'):
+            feedback_json, scores_json = compute_feedback(
+                ref_json, usr_json, ref_data=ref_data, out_dir=d_kp
+            )
+            precompress(feedback_json)
+            precompress(scores_json)
+            fb_m = ck.complete('feedback', fb_fp,
+                               [feedback_json, scores_json, os.path.join(d_kp, SIMILARITY_FILE)],
+                               data={'feedback': os.path.relpath(feedback_json, work),
+                                     'scores':   os.path.relpath(scores_json, work)})
+    feedback_json = os.path.join(work, fb_m['data']['feedback'])
+    scores_json   = os.path.join(work, fb_m['data']['scores'])
+
+    # 8) 최종 비디오 렌더링 (싱크 구간을 디코딩하면서 키포인트로 스켈레톤을 그림)
+    #    파이프라인에서 유일한 인코딩이며 댄서 오디오도 같은 패스에서 붙임.
+    #    풀이 있으면 구간별로 나눠 여러 프로세스에서 인코딩한 뒤 concat.
+    #    중간에 실패해도 반쯤 쓴 영상이 결과로 보이지 않도록 임시 이름으로 렌더링 후 교체
+    final_video = os.path.join(work, 'final_feedback_with_audio.mp4')
+    render_fp = ck.fingerprint('rendering', feedback=fb_m['digest'], sync=sync_m['digest'])
+    if ck.valid('rendering', render_fp) is not None:
+        job.skip('rendering')
+    else:
+        ck.invalidate('rendering')
+        tmp_video = os.path.join(work, 'rendering.tmp.mp4')
+        render = extract_pool.render_feedback if extract_pool is not None else render_feedback_stream
+        sim = load_similarity(os.path.join(d_kp, SIMILARITY_FILE))
+        with job.stage_timer('rendering'):
+            render(
+                feedback_json,
+                teacher_video=synced_dancer,
+                student_video=synced_trainee,
+                teacher_kp=ref_kp if ref_kp is not None else load_pose_keypoints(ref_json),
+                student_kp=load_pose_keypoints(usr_json),
+                out_video_path=tmp_video,
+                fps=sync_info['fps'],
+                teacher_start=d_start,
+                student_start=t_start,
+                num_frames=n_frames,
+                audio=(synced_dancer, d_start / sync_info['fps']),
+                student_index=_student_index(sim)
+            )
+            os.replace(tmp_video, final_video)
+            ck.complete('rendering', render_fp, [final_video])
+
+    rel = job.job_id
+    return {
+        'final_video': f"{rel}/{os.path.basename(final_video)}",
+        'feedback_json': f"{rel}/dancer_kp/{os.path.basename(feedback_json)}",
+        'scores_json': f"{rel}/dancer_kp/{os.path.basename(scores_json)}",
+    }
+
+
+def _student_index(sim: dict):
+    # DTW 로 채점했으면 레퍼런스 프레임마다 채점에 쓴 연습생 프레임을 그리도록 정렬 인덱스를 넘김
+    return sim['user_index'] if str(sim['alignment']) == 'dtw' else None
+
+
+def _pipeline_settings() -> dict:
+    # 결과에 영향을 주는 설정 (같은 업로드라도 이게 다르면 다시 계산)
+    return dict(extraction_settings(),
+                trim=current_app.config.get('SYNC_TRIM', 'offsets'),
+                similarity=similarity_settings())
+
+
+def _finished_result_exists(status: dict) -> bool:
+    base = current_app.config['DATA_DIR']
+    result = status.get('result') or {}
+    paths = [result.get(k) for k in ('final_video', 'feedback_json', 'scores_json')]
+    return all(p and os.path.isfile(os.path.join(base, p)) for p in paths)
+
+
+def _submit_compare(job_id: str, work: str, dancer_path: str, trainee_path: str,
+                    dancer_hash: str, trainee_hash: str,
+                    ref_cache: ReferenceCache = None, ref_key: str = None) -> tuple[dict, bool]:
+    """
+    같은 (댄서, 연습생, 설정) 작업이 이미 끝났거나 진행 중이면 그 작업 상태를 돌려주고
+    방금 만든 작업 폴더는 지웁니다. 아니면 새 작업을 워커 풀에 넘깁니다.
+    Returns: (작업 상태 dict, 중복 여부)
+    """
+    base  = current_app.config['DATA_DIR']
+    queue = get_job_queue()
+    index = get_job_index()
+    key   = job_key(dancer_hash, trainee_hash, _pipeline_settings())
+    if ref_cache is None:
+        ref_cache = get_reference_cache()
+    if ref_key is None and ref_cache.enabled:
+        ref_key = ref_cache.key_for_hash(dancer_hash, extraction_settings())
+
+    with index.lock:
+        existing = index.lookup(key)
+        status = queue.get(existing, base_dir=base) if existing else None
+        if status is not None and (
+            status['status'] in ('queued', 'running')
+            or (status['status'] == 'done' and _finished_result_exists(status))
+        ):
+            shutil.rmtree(work, ignore_errors=True)
+            get_retention().touch(existing)
+            return status, True
+
+        job = _enqueue_compare(job_id, work, dancer_path, trainee_path,
+                               (dancer_hash, trainee_hash), ref_cache, ref_key)
+        index.register(key, job_id)
+    return job.to_dict(), False
+
+
+def _enqueue_compare(job_id: str, work: str, dancer_path: str, trainee_path: str,
+                     input_hashes: tuple, ref_cache: ReferenceCache, ref_key: str):
+    return get_job_queue().submit(
+        job_id, work, run_compare_job, work, dancer_path, trainee_path,
+        ref_cache=ref_cache,
+        extract_pool=get_extract_pool(),
+        trim=current_app.config.get('SYNC_TRIM', 'offsets'),
+        ref_key=ref_key,
+        retention=get_retention() if current_app.config.get('PRUNE_INTERMEDIATES') else None,
+        input_hashes=input_hashes
+    )
+
 
 @compare_bp.route('/', methods=['POST'])
 def compare_videos():
+    """
+    multipart(dancer, trainee 파일) 또는
+    JSON {"dancer_upload": upload_id, "trainee_upload": upload_id} (청크 업로드를 마친 경우)
+    """
     # 1) 업로드 확인
-    dancer  = request.files.get('dancer')
-    trainee = request.files.get('trainee')
-    if not dancer or not trainee:
-        return jsonify(error="댄서/연습생 영상을 모두 업로드하세요"), 400
+    body = request.get_json(silent=True) if request.is_json else None
+    if body is not None:
+        ids = (body.get('dancer_upload'), body.get('trainee_upload'))
+        if not all(isinstance(i, str) and JOB_ID_RE.fullmatch(i) for i in ids):
+            return jsonify(error="dancer_upload / trainee_upload 를 지정하세요"), 400
+        store = get_upload_store()
+        for upload_id in ids:
+            up = store.get(upload_id)
+            if up is None:
+                return jsonify(error="존재하지 않는 업로드입니다", upload_id=upload_id), 404
+            if not up.complete:
+                return jsonify(error="업로드가 아직 끝나지 않았습니다", **up.to_dict()), 409
+    else:
+        dancer  = request.files.get('dancer')
+        trainee = request.files.get('trainee')
+        if not dancer or not trainee:
+            return jsonify(error="댄서/연습생 영상을 모두 업로드하세요"), 400
 
     # 2) 작업 디렉토리 생성
     base   = current_app.config['DATA_DIR']
@@ -28,79 +455,388 @@ def compare_videos():
     work   = os.path.join(base, job_id)
     os.makedirs(work, exist_ok=True)
 
-    # 3) 원본 저장
+    # 3) 원본 저장 (쓰면서 내용 해시 계산, 청크 업로드는 이미 계산된 해시를 그대로 사용)
     dancer_path  = os.path.join(work, 'dancer.mp4')
     trainee_path = os.path.join(work, 'trainee.mp4')
-    dancer.save(dancer_path)
-    trainee.save(trainee_path)
+    if body is not None:
+        try:
+            # 둘 다 옮길 수 있을 때만 옮김 (하나가 실패해도 다른 업로드는 그대로 남음)
+            dancer_up, trainee_up = store.take_all([(ids[0], dancer_path), (ids[1], trainee_path)])
+            dancer_hash, trainee_hash = dancer_up.sha256, trainee_up.sha256
+        except UploadError as e:
+            shutil.rmtree(work, ignore_errors=True)
+            return jsonify(error=str(e), **e.extra), e.status
+    else:
+        dancer_hash  = save_with_hash(dancer, dancer_path)
+        trainee_hash = save_with_hash(trainee, trainee_path)
+
+    # 4~8) 워커 풀에 넘기고 바로 job_id 반환 (같은 업로드면 기존 작업 결과/진행 상태)
+    response, deduplicated = _submit_compare(
+        job_id, work, dancer_path, trainee_path, dancer_hash, trainee_hash
+    )
+    response['deduplicated'] = deduplicated
+    response['status_url'] = f"/compare/{response['job_id']}"
+    return jsonify(response), 200 if response['status'] == 'done' else 202
 
-    durations = {}
 
-    # 4) 싱크
-    start = time.time()
+@compare_bp.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    청크 업로드 시작. JSON {"size": 전체 바이트, "filename": 선택}
+    이후 PATCH /compare/uploads/<upload_id> 에 Upload-Offset 헤더와 함께 본문을 이어서 보냄
+    """
+    body = request.get_json(silent=True) or {}
     try:
-        synced_dancer, synced_trainee = sync_pair(dancer_path, trainee_path, work)
-    except Exception as e:
-        return jsonify(error=f"싱크 실패: {e}"), 500
-    durations['sync'] = time.time() - start
+        up = get_upload_store().create(body.get('size'), body.get('filename'))
+    except UploadError as e:
+        return jsonify(error=str(e), **e.extra), e.status
+    response = up.to_dict()
+    response['upload_url'] = f"/compare/uploads/{up.upload_id}"
+    return jsonify(response), 201
 
-    # 5) 키포인트 추출 (댄서)
-    d_kp = os.path.join(work, 'dancer_kp')
-    os.makedirs(d_kp, exist_ok=True)
-    start = time.time()
-    _, ref_json, ref_frames = extract_keypoints(synced_dancer, d_kp)
-    durations['extract_dancer'] = time.time() - start
 
-    # 6) 키포인트 추출 (연습생)
-    t_kp = os.path.join(work, 'trainee_kp')
-    os.makedirs(t_kp, exist_ok=True)
-    start = time.time()
-    _, usr_json, usr_frames = extract_keypoints(synced_trainee, t_kp)
-    durations['extract_trainee'] = time.time() - start
+@compare_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+def append_upload(upload_id):
+    if not JOB_ID_RE.fullmatch(upload_id):
+        return jsonify(error="존재하지 않는 업로드입니다"), 404
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify(error="Upload-Offset 헤더가 필요합니다"), 400
+    try:
+        # request.stream 을 그대로 읽어 디스크에 씀 (본문 전체를 메모리에 올리지 않음)
+        up = get_upload_store().append(upload_id, offset, request.stream)
+    except UploadError as e:
+        return jsonify(error=str(e), **e.extra), e.status
+    return jsonify(up.to_dict()), 200
 
-    # 7) 피드백 계산
-    start = time.time()
-    feedback_json, scores_json = compute_feedback(ref_json, usr_json)
-    durations['feedback'] = time.time() - start
-
-    # 8) 최종 비디오 렌더링
-    final_video = os.path.join(work, 'final_feedback.mp4')
-    start = time.time()
-    render_feedback_video(
-        feedback_json,
-        teacher_frames=ref_frames,
-        student_frames=usr_frames,
-        out_video_path=final_video,
-        fps=30
-    )
-    durations['rendering'] = time.time() - start
-
-    # 9) 오디오 머지 (댄서 영상 오디오 사용)
-    merged_video = os.path.join(work, 'final_feedback_with_audio.mp4')
-    start = time.time()
-    subprocess.run([
-        "ffmpeg", "-y",
-        "-i", final_video,
-        "-i", synced_dancer,
-        "-c:v", "copy",
-        "-c:a", "aac",
-        "-map", "0:v:0",
-        "-map", "1:a:0",
-        "-shortest",
-        merged_video
-    ], check=True)
-    durations['audio_merge'] = time.time() - start
-    final_video = merged_video
-
-
-    rel = job_id
-
-    # 10) response에 feedback_json도 포함
-    response = {
-        'final_video': f"{rel}/{os.path.basename(final_video)}",
-        'feedback_json': f"{rel}/dancer_kp/{os.path.basename(feedback_json)}",
-        'scores_json': f"{rel}//dancer_kp/{os.path.basename(scores_json)}",
-        'durations': durations
+
+@compare_bp.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    # 이어 올리기 전에 서버가 받은 offset 확인
+    up = get_upload_store().get(upload_id) if JOB_ID_RE.fullmatch(upload_id) else None
+    if up is None:
+        return jsonify(error="존재하지 않는 업로드입니다"), 404
+    return jsonify(up.to_dict()), 200
+
+
+@compare_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload(upload_id):
+    if JOB_ID_RE.fullmatch(upload_id):
+        get_upload_store().discard(upload_id)
+    return '', 204
+
+
+def _link_or_copy(src: str, dst: str):
+    # 같은 볼륨이면 하드링크로 (배치마다 댄서 영상을 복사하지 않음)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@compare_bp.route('/batch', methods=['POST'])
+def compare_batch():
+    """
+    댄서 영상 1개(dancer) + 연습생 영상 N개(trainee 여러 개)를 한 번에 받습니다.
+    연습생마다 일반 compare 작업을 만들어 워커 풀에 넘기고, 댄서 쪽 키포인트/오디오는
+    레퍼런스 캐시로 한 번만 계산해 모든 작업이 같이 씁니다.
+    """
+    # 1) 업로드 확인
+    dancer   = request.files.get('dancer')
+    trainees = [f for f in request.files.getlist('trainee') if f and f.filename]
+    if not dancer or not trainees:
+        return jsonify(error="댄서 영상 1개와 연습생 영상을 1개 이상 업로드하세요"), 400
+
+    # 2) 배치 디렉토리 생성 + 댄서 영상 저장
+    base     = current_app.config['DATA_DIR']
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(base, batch_id)
+    os.makedirs(batch_dir, exist_ok=True)
+    dancer_src = os.path.join(batch_dir, 'dancer.mp4')
+    dancer_hash = save_with_hash(dancer, dancer_src)
+
+    # 3) 레퍼런스 캐시 키는 한 번만 계산 (전역 캐시를 끈 경우 배치 전용 캐시 사용)
+    ref_cache = get_reference_cache()
+    if not ref_cache.enabled:
+        ref_cache = ReferenceCache(os.path.join(batch_dir, 'reference'), max_bytes=1 << 62)
+    ref_key = ref_cache.key_for_hash(dancer_hash, extraction_settings())
+
+    # 4) 연습생마다 작업 생성 (이미 같은 조합을 처리한 적이 있으면 그 작업을 그대로 사용)
+    jobs = []
+    for i, trainee in enumerate(trainees):
+        job_id = uuid.uuid4().hex
+        work   = os.path.join(base, job_id)
+        os.makedirs(work, exist_ok=True)
+        dancer_path  = os.path.join(work, 'dancer.mp4')
+        trainee_path = os.path.join(work, 'trainee.mp4')
+        _link_or_copy(dancer_src, dancer_path)
+        trainee_hash = save_with_hash(trainee, trainee_path)
+        status, _ = _submit_compare(
+            job_id, work, dancer_path, trainee_path, dancer_hash, trainee_hash,
+            ref_cache=ref_cache, ref_key=ref_key
+        )
+        jobs.append({'trainee': secure_filename(trainee.filename) or f"trainee_{i}",
+                     'job_id': status['job_id']})
+    # 작업마다 링크/복사해 뒀으므로 배치 폴더의 댄서 영상은 더 필요 없음
+    os.remove(dancer_src)
+
+    with open(os.path.join(batch_dir, BATCH_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'batch_id': batch_id, 'jobs': jobs}, f, ensure_ascii=False)
+
+    response = _batch_status(batch_id, jobs)
+    response['status_url'] = f"/compare/batch/{batch_id}"
+    return jsonify(response), 202
+
+
+def _batch_status(batch_id: str, jobs: list) -> dict:
+    """
+    연습생별 작업 상태와, 끝난 작업들의 scores.json 프레임 점수(final) 평균 순위
+    """
+    base  = current_app.config['DATA_DIR']
+    queue = get_job_queue()
+    results, ranking = [], []
+    for entry in jobs:
+        status = queue.get(entry['job_id'], base_dir=base) or {'status': 'unknown'}
+        item = dict(entry, status=status.get('status'), progress=status.get('progress'),
+                    result=status.get('result'), error=status.get('error'))
+        if item['status'] == 'done' and item['result']:
+            try:
+                with open(os.path.join(base, item['result']['scores_json']), 'r', encoding='utf-8') as f:
+                    scores = json.load(f)['frame_scores']
+            except FileNotFoundError:
+                # 보존 정책으로 결과가 정리된 작업은 순위에서 제외
+                item.update(status='expired', result=None)
+                results.append(item)
+                continue
+            item['final_avg'] = float(sum(scores) / len(scores)) if scores else 0.0
+            ranking.append(item)
+        results.append(item)
+
+    ranking.sort(key=lambda r: r['final_avg'], reverse=True)
+    summary = [{'rank': k + 1, 'trainee': r['trainee'], 'job_id': r['job_id'], 'final_avg': r['final_avg']}
+               for k, r in enumerate(ranking)]
+    states = [r['status'] for r in results]
+    if all(st in ('done', 'failed', 'expired', 'unknown') for st in states):
+        status = 'done'
+    elif all(st == 'queued' for st in states):
+        status = 'queued'
+    else:
+        status = 'running'
+    return {'batch_id': batch_id, 'status': status, 'jobs': results, 'ranking': summary}
+
+
+@compare_bp.route('/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    if not JOB_ID_RE.fullmatch(batch_id):
+        return jsonify(error="존재하지 않는 배치입니다"), 404
+    path = os.path.join(current_app.config['DATA_DIR'], batch_id, BATCH_FILE)
+    if not os.path.isfile(path):
+        return jsonify(error="존재하지 않는 배치입니다"), 404
+    with open(path, 'r', encoding='utf-8') as f:
+        batch = json.load(f)
+    return jsonify(_batch_status(batch_id, batch['jobs'])), 200
+
+
+@compare_bp.route('/models', methods=['GET'])
+def model_status():
+    # 워커별 모델 로드 시간 / 워밍업 상태
+    # (병렬 추출 모드에서는 모델이 추출 프로세스에만 올라가므로 풀 워커들이 보내 온 상태를 합침)
+    status = registry_status()
+    pool = get_extract_pool()
+    if pool is not None:
+        status.update(pool.model_status())
+    return jsonify(status), 200
+
+
+@compare_bp.route('/storage', methods=['GET'])
+def storage_usage():
+    # 작업 폴더 / 레퍼런스 캐시 / 청크 업로드 디스크 사용량과 마지막 정리 결과
+    return jsonify({
+        'data':            get_retention().usage(),
+        'reference_cache': get_reference_cache().usage(),
+        'uploads':         get_upload_store().usage(),
+    }), 200
+
+
+@compare_bp.route('/<job_id>', methods=['GET'])
+def compare_status(job_id):
+    if not JOB_ID_RE.fullmatch(job_id):
+        return jsonify(error="존재하지 않는 작업입니다"), 404
+    status = get_job_queue().get(job_id, base_dir=current_app.config['DATA_DIR'])
+    if status is None:
+        return jsonify(error="존재하지 않는 작업입니다"), 404
+    get_retention().touch(job_id)
+    return jsonify(status), 200
+
+
+@compare_bp.route('/<job_id>/resume', methods=['POST'])
+def resume(job_id):
+    """
+    실패했거나 서버 재시작으로 멈춘 작업을 같은 job_id 로 다시 실행합니다.
+    work/stages/ 의 완료 기록과 입력 지문이 맞는 단계(싱크, 댄서/연습생 추출, 피드백, 렌더링)는 건너뛰고
+    빠졌거나 입력이 바뀐 단계부터 다시 실행합니다.
+    """
+    if not JOB_ID_RE.fullmatch(job_id):
+        return jsonify(error="존재하지 않는 작업입니다"), 404
+    base  = current_app.config['DATA_DIR']
+    work  = os.path.join(base, job_id)
+    queue = get_job_queue()
+
+    with get_job_index().lock:
+        status = queue.get(job_id, base_dir=base)
+        if status is None:
+            return jsonify(error="존재하지 않는 작업입니다"), 404
+        if os.path.abspath(work) in {os.path.abspath(d) for d in queue.active_dirs()}:
+            return jsonify(dict(status, error="이미 진행 중인 작업입니다")), 409
+        if status['status'] == 'done' and _finished_result_exists(status):
+            return jsonify(status), 200
+
+        dancer_path  = os.path.join(work, 'dancer.mp4')
+        trainee_path = os.path.join(work, 'trainee.mp4')
+        if not (os.path.isfile(dancer_path) and os.path.isfile(trainee_path)):
+            return jsonify(error="원본 영상이 정리되어 다시 실행할 수 없습니다"), 409
+
+        # 업로드 때 계산한 해시를 다시 사용 (예전 작업이면 작업 안에서 계산)
+        inputs = Checkpoints(work).load_inputs()
+        hashes = (inputs['dancer'], inputs['trainee']) if inputs else None
+        ref_cache = get_reference_cache()
+        ref_key = (ref_cache.key_for_hash(hashes[0], extraction_settings())
+                   if hashes and ref_cache.enabled else None)
+        job = _enqueue_compare(job_id, work, dancer_path, trainee_path, hashes, ref_cache, ref_key)
+
+    response = job.to_dict()
+    response['status_url'] = f"/compare/{job_id}"
+    return jsonify(response), 202
+
+
+def _rescore_params(body: dict, stored_alignment: str) -> dict:
+    params = {}
+    for name, default in RESCORE_DEFAULTS.items():
+        value = body.get(name, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} 는 숫자여야 합니다")
+        params[name] = float(value)
+    if not 0.0 <= params['angle_weight'] <= 1.0:
+        raise ValueError("angle_weight 는 0~1 사이여야 합니다")
+    if not 0.0 <= params['percentile'] <= 100.0:
+        raise ValueError("percentile 은 0~100 사이여야 합니다")
+    params['alignment'] = body.get('alignment', stored_alignment)
+    if params['alignment'] not in ('frame', 'dtw'):
+        raise ValueError("alignment 는 frame 또는 dtw 여야 합니다")
+    return params
+
+
+def _sources_exist(work: str) -> bool:
+    # 작업이 끝나면 원본 영상은 정리될 수 있음 (KEEP_SOURCE_VIDEOS 가 꺼져 있을 때)
+    try:
+        with open(os.path.join(work, SYNC_FILE), 'r', encoding='utf-8') as f:
+            sync = json.load(f)
+    except FileNotFoundError:
+        return False
+    return all(os.path.isfile(os.path.join(work, sync[k])) for k in ('dancer_video', 'trainee_video'))
+
+
+def run_rescore_render(job, work: str, out_dir: str, feedback_json: str, sim: dict,
+                       extract_pool: ExtractPool = None) -> dict:
+    """
+    재채점한 feedback.json 으로 피드백 영상만 다시 렌더링 (싱크/추출은 원래 작업 결과 재사용)
+    """
+    with open(os.path.join(work, SYNC_FILE), 'r', encoding='utf-8') as f:
+        sync = json.load(f)
+    d_start, t_start = sync['start_frames']
+    dancer_video = os.path.join(work, sync['dancer_video'])
+    final_video  = os.path.join(out_dir, 'final_feedback_with_audio.mp4')
+    # 다 만들어진 뒤에만 보이도록 임시 이름으로 렌더링 후 교체 (immutable 캐시 대상)
+    tmp_video    = os.path.join(out_dir, 'rendering.tmp.mp4')
+    render = extract_pool.render_feedback if extract_pool is not None else render_feedback_stream
+    with job.stage_timer('rendering'):
+        render(
+            feedback_json,
+            teacher_video=dancer_video,
+            student_video=os.path.join(work, sync['trainee_video']),
+            teacher_kp=(sim['kp_ref_raw'], sim['vis_ref']),
+            student_kp=(sim['kp_user_raw'], sim['vis_user']),
+            out_video_path=tmp_video,
+            fps=sync['fps'],
+            teacher_start=d_start,
+            student_start=t_start,
+            num_frames=sync['num_frames'],
+            audio=(dancer_video, d_start / sync['fps']),
+            student_index=_student_index(sim)
+        )
+        os.replace(tmp_video, final_video)
+    rel = os.path.relpath(final_video, os.path.dirname(work)).replace(os.sep, '/')
+    return {'final_video': rel}
+
+
+@compare_bp.route('/<job_id>/rescore', methods=['POST'])
+def rescore(job_id):
+    """
+    끝난 작업의 similarity.npz (전처리된 키포인트 + 프레임별 각도/Procrustes 배열)로
+    점수와 피드백 JSON 만 다시 계산합니다. 같은 파라미터는 이전 결과를 그대로 돌려주고,
+    영상은 {"render": true} 일 때만 워커 풀에서 다시 렌더링합니다.
+    """
+    if not JOB_ID_RE.fullmatch(job_id):
+        return jsonify(error="존재하지 않는 작업입니다"), 404
+    base = current_app.config['DATA_DIR']
+    work = os.path.join(base, job_id)
+    sim_path = os.path.join(work, 'dancer_kp', SIMILARITY_FILE)
+    if not os.path.isfile(sim_path):
+        if get_job_queue().get(job_id, base_dir=base) is None:
+            return jsonify(error="존재하지 않는 작업입니다"), 404
+        return jsonify(error="아직 재채점할 수 있는 결과가 없습니다"), 409
+    get_retention().touch(job_id)
+
+    # 1) 파라미터 확인
+    body = request.get_json(silent=True) or {}
+    sim  = load_similarity(sim_path)
+    try:
+        params = _rescore_params(body, str(sim['alignment']))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    # 2) 정렬 방식이 바뀌었으면 전처리된 키포인트에서 배열만 다시 계산
+    if params['alignment'] != str(sim['alignment']):
+        if params['alignment'] == 'frame':
+            trim_to_common_length(sim)
+        sim.update(similarity_from_features(
+            sim['kp_ref_raw'], sim['kp_ref'], sim['kp_user_raw'], sim['kp_user'], params['alignment']
+        ))
+
+    # 3) 파라미터별 폴더에 점수/피드백 저장 (같은 파라미터면 그대로 재사용)
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    out_dir = os.path.join(work, 'rescores', key)
+    feedback_json = os.path.join(out_dir, 'feedback.json')
+    scores_json   = os.path.join(out_dir, 'scores.json')
+    if not (os.path.isfile(feedback_json) and os.path.isfile(scores_json)):
+        feedback_json, scores_json = score_feedback(
+            sim, out_dir, **{k: params[k] for k in RESCORE_DEFAULTS}
+        )
+        precompress(feedback_json)
+        precompress(scores_json)
+
+    rel = f"{job_id}/rescores/{key}"
+    result = {
+        'feedback_json': f"{rel}/feedback.json",
+        'scores_json':   f"{rel}/scores.json",
+        'final_video':   None,
     }
-    print(response)
+    response = {'job_id': job_id, 'params': params, 'result': result}
+
+    # 4) (옵션) 영상 다시 렌더링 — 이미 있으면 재사용, 없으면 워커 풀에 넘기고 상태 URL 반환
+    final_video = os.path.join(out_dir, 'final_feedback_with_audio.mp4')
+    if os.path.isfile(final_video):
+        result['final_video'] = f"{rel}/final_feedback_with_audio.mp4"
+    elif body.get('render'):
+        if not _sources_exist(work):
+            return jsonify(error="원본 영상이 정리되어 영상을 다시 렌더링할 수 없습니다", **response), 409
+        render_id = uuid.uuid4().hex
+        job = get_job_queue().submit(
+            render_id, out_dir, run_rescore_render, work, out_dir, feedback_json, sim,
+            extract_pool=get_extract_pool(), stages=['rendering']
+        )
+        response['render'] = job.to_dict()
+        response['render']['status_url'] = f"/compare/{render_id}"
+        return jsonify(response), 202
     return jsonify(response), 200